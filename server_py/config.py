@@ -14,6 +14,14 @@ class Config:
     OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4")  # gpt-4, gpt-3.5-turbo, gpt-4-turbo
     GOOGLE_MODEL = os.getenv("GOOGLE_MODEL", "gemini-2.5-flash-lite")  # gemini-2.5-flash-lite (fastest), gemini-1.5-flash-latest, gemini-pro
     
+    # Image detection quizzes: serve generated images from /api/quiz/image-detection/image/{id} instead of inlining them as data URLs.
+    # The images live in process memory, so only enable this on a single instance or with session affinity.
+    IMAGE_DETECTION_IMAGE_URLS = os.getenv("IMAGE_DETECTION_IMAGE_URLS", "false").lower() == "true"
+    # Max concurrent Imagen requests per process (roughly the project's Imagen quota per minute / 60 x request latency)
+    IMAGEN_MAX_CONCURRENCY = int(os.getenv("IMAGEN_MAX_CONCURRENCY", "8"))
+    # Max concurrent quiz generator LLM requests per process (kept under the provider's rate limit so bursts queue instead of failing)
+    LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+    
     PORT = int(os.getenv("PORT", "8080"))  # Default to 8080 for Cloud Run, 3002 for local dev
     
     @classmethod
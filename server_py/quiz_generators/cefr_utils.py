@@ -1,62 +1,46 @@
 """CEFR level descriptions and utilities."""
-import os
-from typing import Dict, Optional
+import re
+from functools import lru_cache
+from pathlib import Path
+from types import MappingProxyType
+from typing import Dict, Mapping
 
-# CEFR level descriptions (loaded from file or defined here)
-CEFR_DESCRIPTIONS: Dict[str, str] = {}
+# CEFR level names, used as titles in prompts
+LEVEL_NAMES: Dict[str, str] = {
+    "A1": "Breakthrough",
+    "A2": "Waystage",
+    "B1": "Threshold",
+    "B2": "Vantage",
+    "C1": "Advanced",
+    "C2": "Mastery"
+}
 
-def load_cefr_descriptions() -> Dict[str, str]:
-    """Load CEFR level descriptions from file."""
-    global CEFR_DESCRIPTIONS
-    
-    if CEFR_DESCRIPTIONS:
-        return CEFR_DESCRIPTIONS
-    
-    # Try to read from the file (path relative to server_py)
-    file_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "web", "public", "cefr_levels.txt")
-    
-    if not os.path.exists(file_path):
-        # Fallback: use hardcoded descriptions
-        return get_fallback_descriptions()
-    
-    current_level = None
-    description_lines = []
-    
-    with open(file_path, 'r', encoding='utf-8') as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                # Empty line - save previous level and reset
-                if current_level and description_lines:
-                    CEFR_DESCRIPTIONS[current_level] = "\n".join(description_lines)
-                    description_lines = []
-                    current_level = None
-                continue
-            
-            # Check if this line starts a new level (e.g., "A1 (Breakthrough)" or "A1 )Breakthrough)")
-            # Pattern: starts with letter followed by digit (A1, A2, B1, etc.)
-            if len(line) >= 2 and line[0].isupper() and line[1].isdigit():
-                # Save previous level if exists
-                if current_level and description_lines:
-                    CEFR_DESCRIPTIONS[current_level] = "\n".join(description_lines)
-                
-                # Extract level code (A1, A2, B1, etc.) - first two characters
-                # Handle formats like "A1 )Breakthrough)" or "A1 (Breakthrough)"
-                level_match = line[:2]  # A1, A2, B1, etc.
-                if level_match in ["A1", "A2", "B1", "B2", "C1", "C2"]:
-                    current_level = level_match
-                    description_lines = []
-            elif current_level:
-                # This is a description line for current level (starts with "- ")
-                if line.startswith("- "):
-                    description_lines.append(line)
-                elif description_lines:
-                    # Continue previous line if it doesn't start with "-"
-                    description_lines[-1] += " " + line
+CEFR_FILE_PATH = Path(__file__).resolve().parent.parent / "web" / "public" / "cefr_levels.txt"
+
+# A level header line ("A1 (Breakthrough)", "A1 )Breakthrough)", ...) followed by its block of
+# non-blank lines; the block ends at the first blank line or the next header
+_LEVEL_BLOCK_RE = re.compile(r'^([ABC][12])\b[^\n]*\n((?:(?![ABC][12]\b)[ \t]*\S[^\n]*(?:\n|$))*)', re.MULTILINE)
+# Line break before a line that doesn't start a new "- " item (continuation of the previous item)
+_CONTINUATION_RE = re.compile(r'\n(?!- )')
+
+def _parse_cefr_file() -> Dict[str, str]:
+    """Parse CEFR level descriptions from the cefr_levels.txt file. Returns {} if not found."""
+    # Try to read from the file (path relative to server_py) in a single read
+    try:
+        text = CEFR_FILE_PATH.read_text(encoding='utf-8')
+    except FileNotFoundError:
+        return {}
     
-    if not CEFR_DESCRIPTIONS:
-        return get_fallback_descriptions()
+    descriptions: Dict[str, str] = {}
+    for match in _LEVEL_BLOCK_RE.finditer(text):
+        lines = "\n".join(line.strip() for line in match.group(2).splitlines())
+        if lines:
+            descriptions[match.group(1)] = _CONTINUATION_RE.sub(" ", lines)
     
+    return descriptions
+
+def load_cefr_descriptions() -> Mapping[str, str]:
+    """Get CEFR level descriptions (parsed once at import)."""
     return CEFR_DESCRIPTIONS
 
 def get_fallback_descriptions() -> Dict[str, str]:
@@ -70,12 +54,16 @@ def get_fallback_descriptions() -> Dict[str, str]:
         "C2": "Can understand with ease virtually everything heard or read. Can summarise information from different spoken and written sources, reconstructing arguments and accounts in a coherent presentation. Can express themselves spontaneously, very fluently and precisely, differentiating finer shades of meaning even in the most complex situations."
     }
 
+# CEFR level descriptions - loaded from file (or the fallback) once at import, read-only afterwards
+CEFR_DESCRIPTIONS: Mapping[str, str] = MappingProxyType(_parse_cefr_file() or get_fallback_descriptions())
+
+@lru_cache(maxsize=32)
 def get_cefr_description(level: str) -> str:
     """
     Get CEFR description for a given level.
     Supports single levels (A1, A2, etc.) and range levels (A1-A2, B1-B2, etc.)
     """
-    descriptions = load_cefr_descriptions()
+    descriptions = CEFR_DESCRIPTIONS
     
     # Handle range levels (e.g., "A1-A2")
     if "-" in level:
@@ -88,25 +76,12 @@ def get_cefr_description(level: str) -> str:
     # Single level
     return descriptions.get(level.upper(), descriptions.get("A1", ""))
 
-def format_cefr_for_prompt(level: str) -> str:
-    """
-    Format CEFR level and description for use in LLM prompts.
-    Returns a formatted string like:
-    "A1 (Breakthrough): Can understand and use familiar everyday expressions..."
-    """
+@lru_cache(maxsize=32)
+def _format_cefr(level: str) -> str:
+    """Build the prompt string for a CEFR level (see format_cefr_for_prompt)."""
     description = get_cefr_description(level)
     level_name = level.upper()
     
-    # Add level name/title
-    level_names = {
-        "A1": "Breakthrough",
-        "A2": "Waystage",
-        "B1": "Threshold",
-        "B2": "Vantage",
-        "C1": "Advanced",
-        "C2": "Mastery"
-    }
-    
     # Handle range levels
     if "-" in level:
         parts = level.split("-")
@@ -114,31 +89,37 @@ def format_cefr_for_prompt(level: str) -> str:
             level_name = f"{parts[0].upper()}-{parts[1].upper()}"
             # Use the higher level's name
             higher = parts[1].strip().upper()
-            title = level_names.get(higher, "")
+            title = LEVEL_NAMES.get(higher, "")
         else:
             title = ""
     else:
-        title = level_names.get(level_name, "")
+        title = LEVEL_NAMES.get(level_name, "")
     
     if title:
         return f"{level_name} ({title}): {description}"
     else:
         return f"{level_name}: {description}"
 
-def get_difficulty_guidelines(level: str) -> str:
+# Every single level and every adjacent range the quiz generators use
+_PROMPT_LEVELS = ["A1", "A2", "B1", "B2", "C1", "C2", "A1-A2", "A2-B1", "B1-B2", "B2-C1", "C1-C2"]
+
+# Prompt strings for every level in _PROMPT_LEVELS
+_FORMATTED_CEFR: Dict[str, str] = {level: _format_cefr(level) for level in _PROMPT_LEVELS}
+
+def format_cefr_for_prompt(level: str) -> str:
     """
-    Get specific difficulty guidelines for a CEFR level.
-    This provides actionable guidance on vocabulary, grammar, and complexity.
+    Format CEFR level and description for use in LLM prompts.
+    Returns a formatted string like:
+    "A1 (Breakthrough): Can understand and use familiar everyday expressions..."
     """
-    # Extract base level if range (e.g., "A1-A2" -> "A2")
-    if "-" in level:
-        parts = level.split("-")
-        base_level = parts[1].strip().upper() if len(parts) == 2 else parts[0].strip().upper()
-    else:
-        base_level = level.upper()
-    
-    guidelines = {
-        "A1": """
+    formatted = _FORMATTED_CEFR.get(level)
+    if formatted is None:
+        formatted = _format_cefr(level)
+    return formatted
+
+# Difficulty guidelines per CEFR level, built once at import
+_GUIDELINES: Mapping[str, str] = MappingProxyType({
+    "A1": """
 VOCABULARY: Use ONLY the 50-100 MOST BASIC words - like a 4-year-old child's vocabulary. Examples: cat, dog, mom, dad, house, car, book, ball, apple, water, milk, bread, hello, bye, yes, no, I, you, he, she, good, bad, big, small, red, blue, green, yellow, one, two, three, eat, drink, sleep, go, come, see, like, want, have, be, do, play, run, jump, sit, stand, up, down, in, out, on, off. NO abstract words, NO complex nouns, NO advanced vocabulary, NO numbers above 10, NO colors beyond basic (red, blue, green, yellow, black, white).
 GRAMMAR: ONLY simple present tense with basic verbs (I am, you are, he is, I like, I have, I want, I see, I go). NO past tense, NO future tense, NO subjunctive, NO conditionals, NO complex tenses, NO modal verbs except "can" and "want". NO plurals except very common ones (cats, dogs). NO possessives except "my", "your".
 SENTENCE STRUCTURE: Maximum 3-5 words per sentence. ONLY subject-verb-object or subject-verb. NO conjunctions except "and" for simple lists. NO complex sentences. NO questions except "What is this?" or "Where is X?".
@@ -146,42 +127,64 @@ COMPLEXITY: ONLY concrete, visible, everyday objects and actions that a 4-year-o
 EXAMPLES: "I like cat", "Dog is big", "I have book", "You are good", "I can see", "Mom is here", "I want apple", "Car is red"
 AVOID: Complex sentences, abstract words, past/future tense, explanations, opinions, descriptions beyond basic adjectives, numbers above 10, complex grammar, plurals, possessives beyond "my/your"
 """,
-        "A2": """
+    "A2": """
 VOCABULARY: Use common words (500-1000 most frequent). Basic descriptive vocabulary
 GRAMMAR: Present, simple past, simple future. Basic conjunctions (and, but, because)
 SENTENCE STRUCTURE: Maximum 12-15 words per sentence. Simple compound sentences allowed
 COMPLEXITY: Everyday situations, familiar topics. Slightly more detailed descriptions
 EXAMPLES: "I went to the store yesterday", "She likes reading because it's interesting"
 """,
-        "B1": """
+    "B1": """
 VOCABULARY: Wider range (1000-2000 words). Include some abstract concepts
 GRAMMAR: All basic tenses, conditional, some modal verbs. Simple relative clauses
 SENTENCE STRUCTURE: 15-20 words per sentence. Multiple clauses with clear connections
 COMPLEXITY: Abstract ideas, opinions, experiences. Moderate detail and explanation
 EXAMPLES: "I would go if I had time", "The book that I read was about history"
 """,
-        "B2": """
+    "B2": """
 VOCABULARY: Extensive vocabulary (2000-4000 words). Abstract and specialized terms
 GRAMMAR: All tenses including subjunctive (if applicable). Complex sentences with multiple clauses
 SENTENCE STRUCTURE: 20-30 words per sentence. Complex subordination and coordination
 COMPLEXITY: Complex ideas, nuanced opinions, detailed explanations
 EXAMPLES: "Had I known about the situation, I would have acted differently"
 """,
-        "C1": """
+    "C1": """
 VOCABULARY: Advanced vocabulary (4000+ words). Idiomatic expressions, subtle distinctions
 GRAMMAR: Full range including advanced structures. Sophisticated use of all tenses
 SENTENCE STRUCTURE: 25-40 words per sentence. Multiple embedded clauses
 COMPLEXITY: Sophisticated ideas, implicit meanings, cultural references
 EXAMPLES: "Despite having been repeatedly warned, the committee proceeded with their controversial decision"
 """,
-        "C2": """
+    "C2": """
 VOCABULARY: Near-native vocabulary. Precise word choice, cultural nuances, specialized terminology
 GRAMMAR: Perfect command of all structures. Creative and flexible use
 SENTENCE STRUCTURE: Any length. Complex nested structures, sophisticated transitions
 COMPLEXITY: Highly abstract concepts, subtle implications, professional/academic discourse
 EXAMPLES: "The paradigm shift notwithstanding, the underlying assumptions remain fundamentally unchallenged"
 """
-    }
+})
+
+@lru_cache(maxsize=32)
+def _difficulty_guidelines(level: str) -> str:
+    """Look up the difficulty guidelines for a CEFR level (see get_difficulty_guidelines)."""
+    # Extract base level if range (e.g., "A1-A2" -> "A2")
+    if "-" in level:
+        parts = level.split("-")
+        base_level = parts[1].strip().upper() if len(parts) == 2 else parts[0].strip().upper()
+    else:
+        base_level = level.upper()
     
-    return guidelines.get(base_level, guidelines["A1"])
+    return _GUIDELINES.get(base_level, _GUIDELINES["A1"])
 
+# Guidelines for every level in _PROMPT_LEVELS
+_LEVEL_GUIDELINES: Dict[str, str] = {level: _difficulty_guidelines(level) for level in _PROMPT_LEVELS}
+
+def get_difficulty_guidelines(level: str) -> str:
+    """
+    Get specific difficulty guidelines for a CEFR level.
+    This provides actionable guidance on vocabulary, grammar, and complexity.
+    """
+    guidelines = _LEVEL_GUIDELINES.get(level)
+    if guidelines is None:
+        guidelines = _difficulty_guidelines(level)
+    return guidelines
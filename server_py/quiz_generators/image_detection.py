@@ -1,67 +1,472 @@
 """Image detection quiz generator."""
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
+from collections import OrderedDict
+from functools import lru_cache
 from langchain_core.messages import SystemMessage, HumanMessage
-import json
+import asyncio
+import httpx
+import os
 import re
-import base64
-import requests
-from .utils import get_llm, get_user_level, get_target_language, get_recent_quiz_content
+import binascii
+import random
+import threading
+import uuid
+from .utils import get_llm, get_user_level, get_target_language, get_recent_quiz_content, get_system_message, get_http_client, get_logger, json_loads, normalize_answer, TARGET_LEVEL_MAP
 from .cefr_utils import format_cefr_for_prompt, get_difficulty_guidelines
-from tools import get_profile, get_session
+from .word_banks import IMAGE_DETECTION_WORDS
+from tools import get_session
 from config import CONFIG
 
+# Google auth imports (needed for the Vertex AI Imagen endpoint)
+try:
+    import google.auth
+    from google.auth.transport.requests import Request
+    from google.oauth2 import service_account
+    GOOGLE_AUTH_AVAILABLE = True
+except ImportError:
+    GOOGLE_AUTH_AVAILABLE = False
+
 llm = get_llm()
+logger = get_logger("Image Gen")
+validation_logger = get_logger("Quiz Val")
 
-async def generate_image_detection(session_id: str) -> Dict[str, Any]:
+if not GOOGLE_AUTH_AVAILABLE:
+    logger.warning("google-auth not available. Vertex AI Imagen will be skipped.")
+
+# System prompts
+WORD_PICKER_SYSTEM_PROMPT = "You are a {target_language} teacher selecting vocabulary words. Respond with ONLY the {target_language} word and its English translation, in the requested format."
+TRANSLATOR_SYSTEM_MESSAGE = SystemMessage(content="You are a translator. Respond with ONLY the English word.")
+VALIDATOR_SYSTEM_PROMPT = "You are a vocabulary evaluator for {target_language}. Evaluate semantic equivalence, not exact word matches."
+
+# Imagen prompt for the quiz picture (only the English object word varies)
+IMAGE_PROMPT_TEMPLATE = """A realistic cartoon illustration of a {english_word}, inspired by Duolingo's art style but maintaining accurate representation and close resemblance to the real object.
+
+CRITICAL REQUIREMENTS:
+- The {english_word} MUST be immediately recognizable and accurately represent the real object
+- Maintain realistic proportions, key features, and defining characteristics of the {english_word}
+- The object should closely resemble its real-world appearance (colors, shape, structure)
+- Prioritize accuracy and recognizability over stylization
+
+Style requirements (without compromising realism):
+- Cartoon style inspired by Duolingo characters - friendly and approachable
+- Bright, cheerful colors that match the object's natural/typical colors
+- Soft, rounded edges while maintaining the object's actual shape
+- Clean, simple design but with all essential features visible
+- White or light neutral background
+- The {english_word} as the single, centered focus
+- No text, labels, speech bubbles, or additional objects
+- Educational quality - suitable for language learning
+- Detailed enough to be instantly identifiable
+
+Balance: Make it look friendly and cartoon-like (Duolingo style) while ensuring it's a realistic, accurate representation that students can easily identify and learn from."""
+
+# Colorful, educational SVG placeholder used when Imagen is unavailable (word displayed prominently)
+SVG_PLACEHOLDER_COLORS = (
+    b"#58CC02",  # Duolingo green
+    b"#1CB0F6",  # Duolingo blue
+    b"#FFC800",  # Duolingo yellow
+    b"#FF9600",  # Orange
+    b"#CE82FF",  # Purple
+)
+SVG_PLACEHOLDER_TEMPLATE = '''<svg width="400" height="400" xmlns="http://www.w3.org/2000/svg">
+  <defs>
+    <linearGradient id="grad" x1="0%" y1="0%" x2="100%" y2="100%">
+      <stop offset="0%" style="stop-color:__COLOR__;stop-opacity:1" />
+      <stop offset="100%" style="stop-color:__COLOR__88;stop-opacity:1" />
+    </linearGradient>
+  </defs>
+  <rect width="400" height="400" fill="url(#grad)" rx="20"/>
+  <circle cx="200" cy="150" r="60" fill="white" opacity="0.3"/>
+  <text x="200" y="280" font-family="Arial, sans-serif" font-size="48" font-weight="bold" 
+        fill="white" text-anchor="middle">__WORD__</text>
+  <text x="200" y="320" font-family="Arial, sans-serif" font-size="24" 
+        fill="white" text-anchor="middle" opacity="0.9">🖼️</text>
+</svg>'''.encode('utf-8')
+SVG_DATA_URL_PREFIX = b"data:image/svg+xml;base64,"
+
+def _svg_placeholder_parts(color: bytes) -> tuple:
     """
-    Generate an image detection quiz.
-    Returns: {
-        "object_word": "word in target language",
-        "image_url": "data:image/png;base64,..." or URL,
-        "difficulty": "A1|A2|B1|B2|C1|C2"
-    }
+    Split the placeholder for one color around the word: (data URL prefix + base64 of the text before the word,
+    leftover bytes before the word, text after the word). The base64 part ends on a 3-byte boundary, so it can be
+    concatenated with the base64 of the rest.
     """
-    session = get_session(session_id)
+    head, tail = SVG_PLACEHOLDER_TEMPLATE.replace(b"__COLOR__", color).split(b"__WORD__")
+    aligned = len(head) - len(head) % 3
+    return (SVG_DATA_URL_PREFIX + binascii.b2a_base64(head[:aligned], newline=False)).decode('ascii'), head[aligned:], tail
+
+# Pre-encoded placeholder parts, one per color
+_SVG_PLACEHOLDER_PARTS = tuple(_svg_placeholder_parts(color) for color in SVG_PLACEHOLDER_COLORS)
+
+# Anything that isn't a word character or whitespace (punctuation the LLM adds around the word)
+_WORD_CLEAN_RE = re.compile(r'[^\w\s]')
+# The same characters within ASCII, for a str.translate fast path on ASCII text
+_ASCII_CLEAN_TABLE = {i: None for i in range(128) if _WORD_CLEAN_RE.match(chr(i))}
+# Markdown code fence around the validator's JSON answer
+_JSON_FENCE_RE = re.compile(r'\A```(?:json)?|```\Z')
+
+# Generated Imagen images per English object word, least recently used first
+# (_IMAGE_CACHE maps the word to an image ID; _IMAGES holds the decoded bytes and mime type, inlined into the quiz or
+# served by /api/quiz/image-detection/image/{id} with IMAGE_DETECTION_IMAGE_URLS)
+IMAGE_CACHE_MAXSIZE = 64
+_IMAGE_CACHE: "OrderedDict[str, str]" = OrderedDict()
+_IMAGES: Dict[str, tuple] = {}
+IMAGE_URL_PREFIX = "/api/quiz/image-detection/image/"
+
+# Imagen calls in progress per English object word, so concurrent requests for the same word share one call
+_IMAGE_INFLIGHT: Dict[str, "asyncio.Future"] = {}
+
+# Target language names that need no translation for the (English) image prompt
+ENGLISH_LANGUAGE_NAMES = frozenset({"english", "en", "en-us", "en-gb"})
+
+# LLM translations to English per (target language, word), least recently used first
+TRANSLATION_CACHE_MAXSIZE = 2048
+_TRANSLATION_CACHE: "OrderedDict[tuple, str]" = OrderedDict()
+
+# Leading articles dropped before comparing answers ("la casa" == "casa"), across the supported languages
+_LEADING_ARTICLES = frozenset({
+    "el", "la", "los", "las", "un", "una", "unos", "unas",  # Spanish
+    "le", "les", "une", "des",  # French
+    "il", "lo", "gli", "uno",  # Italian
+    "o", "a", "os", "as", "um", "uma",  # Portuguese
+    "der", "die", "das", "ein", "eine",  # German
+    "the", "an",  # English
+})
+
+def _clean_word(text: str) -> str:
+    """Remove punctuation, keeping word characters and whitespace."""
+    if text.isascii():
+        return text.translate(_ASCII_CLEAN_TABLE)
+    return _WORD_CLEAN_RE.sub('', text)
+
+def _answer_key(text: str) -> str:
+    """Normalize an answer for the exact-match fast path: no case, accents, punctuation or leading article."""
+    words = _clean_word(normalize_answer(text)).split()
+    if len(words) > 1 and words[0] in _LEADING_ARTICLES:
+        words = words[1:]
+    return " ".join(words)
+
+def _cache_image(english_word: str, image_bytes: bytes, mime_type: str) -> str:
+    """Store a generated image in the LRU cache, evicting the oldest entry when full. Returns the image ID."""
+    image_id = uuid.uuid4().hex
+    _IMAGES[image_id] = (image_bytes, mime_type)
+    _IMAGE_CACHE[english_word] = image_id
+    _IMAGE_CACHE.move_to_end(english_word)
+    if len(_IMAGE_CACHE) > IMAGE_CACHE_MAXSIZE:
+        _, evicted_id = _IMAGE_CACHE.popitem(last=False)
+        _IMAGES.pop(evicted_id, None)
+    return image_id
+
+def _cache_translation(key: tuple, english_word: str) -> None:
+    """Store a translation in the LRU cache, evicting the oldest entry when full."""
+    _TRANSLATION_CACHE[key] = english_word
+    _TRANSLATION_CACHE.move_to_end(key)
+    if len(_TRANSLATION_CACHE) > TRANSLATION_CACHE_MAXSIZE:
+        _TRANSLATION_CACHE.popitem(last=False)
+
+def get_image(image_id: str) -> Optional[tuple]:
+    """Get a generated image by ID as (bytes, mime type), or None if unknown or evicted."""
+    return _IMAGES.get(image_id)
+
+def _image_url(image_id: str) -> str:
+    """URL the frontend loads the image from: an inline data URL, or the image endpoint when configured."""
+    if CONFIG.IMAGE_DETECTION_IMAGE_URLS:
+        return IMAGE_URL_PREFIX + image_id
+    image_bytes, mime_type = _IMAGES[image_id]
+    return f"data:{mime_type};base64,{binascii.b2a_base64(image_bytes, newline=False).decode('ascii')}"
+
+# Imagen endpoint on Vertex AI (project and location are fixed for the process)
+VERTEX_API_URL = (
+    f"https://{CONFIG.GOOGLE_LOCATION}-aiplatform.googleapis.com/v1/projects/{CONFIG.GOOGLE_PROJECT_ID}"
+    f"/locations/{CONFIG.GOOGLE_LOCATION}/publishers/google/models/imagen-3.0-generate-001:predict"
+)
+
+# Retry transient Imagen failures (quota bursts, overload) with full-jitter exponential backoff
+IMAGEN_MAX_TRIES = 3
+IMAGEN_BACKOFF_BASE = 0.5
+IMAGEN_BACKOFF_MAX = 8.0
+_RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+# Vertex AI Imagen output: JPEG quality (0-100)
+IMAGEN_JPEG_QUALITY = 85
+
+# Cap in-flight Imagen requests across all sessions so bursts queue here instead of tripping the per-minute quota
+_IMAGEN_SEMAPHORE = asyncio.Semaphore(CONFIG.IMAGEN_MAX_CONCURRENCY)
+
+async def _post_with_backoff(url: str, **kwargs) -> httpx.Response:
+    """POST to Imagen, retrying 429/5xx responses. Honors Retry-After; returns the last response."""
+    for attempt in range(IMAGEN_MAX_TRIES):
+        async with _IMAGEN_SEMAPHORE:
+            response = await get_http_client().post(url, **kwargs)
+        if response.status_code not in _RETRY_STATUS_CODES or attempt == IMAGEN_MAX_TRIES - 1:
+            return response
+        retry_after = response.headers.get("Retry-After", "")
+        if retry_after.isdigit():
+            delay = min(float(retry_after), IMAGEN_BACKOFF_MAX)
+        else:
+            delay = random.uniform(0, min(IMAGEN_BACKOFF_MAX, IMAGEN_BACKOFF_BASE * 2 ** attempt))
+        logger.warning("⚠️ Imagen returned %s, retrying in %.1fs", response.status_code, delay)
+        await asyncio.sleep(delay)
+    return response
+
+# Required scopes for Vertex AI, and the service account file (relative paths are relative to server_py/), resolved at import
+VERTEX_SCOPES = ['https://www.googleapis.com/auth/cloud-platform']
+VERTEX_CREDENTIALS_PATH = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
+if VERTEX_CREDENTIALS_PATH and not os.path.isabs(VERTEX_CREDENTIALS_PATH):
+    VERTEX_CREDENTIALS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), VERTEX_CREDENTIALS_PATH)
+
+# Vertex AI credentials, resolved once per process and reused (the token is refreshed in place when it expires)
+_vertex_credentials = None
+_vertex_credentials_lock = threading.Lock()
+
+def _get_vertex_credentials():
+    """
+    Get the Google credentials for Vertex AI, resolving them on first use.
+    Returns None if no credentials could be resolved (resolution is retried on the next call).
+    """
+    global _vertex_credentials
+    with _vertex_credentials_lock:
+        if _vertex_credentials is not None:
+            return _vertex_credentials
+        try:
+            # Try to use service account credentials if available
+            if VERTEX_CREDENTIALS_PATH:
+                _vertex_credentials = service_account.Credentials.from_service_account_file(
+                    VERTEX_CREDENTIALS_PATH,
+                    scopes=VERTEX_SCOPES
+                )
+            else:
+                # Try default credentials with scopes
+                _vertex_credentials, _ = google.auth.default(scopes=VERTEX_SCOPES)
+        except Exception as auth_error:
+            logger.warning("⚠️ Auth error: %s. Trying API key method...", auth_error)
+        return _vertex_credentials
+
+def _get_vertex_access_token() -> Optional[str]:
+    """
+    Return a valid Vertex AI access token, refreshing the cached credentials only when the token has expired.
+    Blocking (credentials file read on first use, token refresh) - run it in a worker thread.
+    Returns None if no credentials could be resolved.
+    """
+    credentials = _get_vertex_credentials()
+    if credentials is None:
+        return None
     
-    # Get user profile
-    profile_str = await get_profile.ainvoke({"session_id": session_id})
-    try:
-        profile = json.loads(profile_str)
-    except:
-        profile = {}
+    with _vertex_credentials_lock:
+        if not credentials.valid:
+            credentials.refresh(Request())
+        return credentials.token
+
+async def _generate_with_vertex(image_prompt: str, access_token_task: "asyncio.Task") -> Optional[str]:
+    """Generate an image with the Vertex AI Imagen endpoint. Returns the base64 image, or None on failure."""
+    vertex_api_url = VERTEX_API_URL
     
-    # Get current CEFR level - prioritize user's stated level from profile
-    quiz_results = session.get("quiz_results", [])
-    current_level = get_user_level(profile, quiz_results)
+    try:
+        # Access token is resolved in a worker thread (started before the LLM calls)
+        access_token = await access_token_task
+        
+        headers = {
+            "Content-Type": "application/json"
+        }
+        
+        # Add authorization header
+        if access_token:
+            headers["Authorization"] = f"Bearer {access_token}"
+        elif CONFIG.GOOGLE_API_KEY:
+            # Fallback: try with API key in URL (may not work for Vertex AI)
+            vertex_api_url = f"{vertex_api_url}?key={CONFIG.GOOGLE_API_KEY}"
+        
+        payload = {
+            "instances": [{
+                "prompt": image_prompt
+            }],
+            "parameters": {
+                "sampleCount": 1,
+                "aspectRatio": "1:1",
+                "safetyFilterLevel": "BLOCK_SOME",
+                "personGeneration": "ALLOW_ALL",
+                # JPEG is several times smaller than the default PNG for these flat cartoon images
+                "outputOptions": {"mimeType": "image/jpeg", "compressionQuality": IMAGEN_JPEG_QUALITY}
+            }
+        }
+        
+        logger.info("Trying Vertex AI endpoint: %s-aiplatform.googleapis.com", CONFIG.GOOGLE_LOCATION)
+        img_response = await _post_with_backoff(
+            vertex_api_url,
+            headers=headers,
+            json=payload,
+            timeout=30
+        )
+        
+        if img_response.status_code == 200:
+            result = json_loads(img_response.content)
+            # Vertex AI response structure
+            predictions = result.get('predictions')
+            if predictions:
+                prediction = predictions[0]
+                image_base64 = prediction.get('bytesBase64Encoded') or prediction.get('imageBytes') or prediction.get('image')
+                if image_base64:
+                    logger.info("✅ Successfully generated image via Vertex AI Imagen API")
+                    return image_base64
+            else:
+                logger.warning("⚠️ Vertex AI response missing predictions")
+                logger.debug("Vertex AI response: %s", result)
+        elif img_response.status_code == 404:
+            logger.warning("⚠️ Vertex AI endpoint not found (404). Trying Generative AI Studio endpoint...")
+        else:
+            error_text = img_response.text[:500] if img_response.text else "Unknown error"
+            logger.warning("⚠️ Vertex AI error %s: %s", img_response.status_code, error_text)
+    except Exception as e:
+        logger.warning("⚠️ Vertex AI error: %s", e)
+    return None
+
+async def _generate_with_ai_studio(image_prompt: str) -> Optional[str]:
+    """Generate an image with the Generative AI Studio endpoint. Returns the base64 image, or None on failure."""
+    api_url_alt = "https://generativelanguage.googleapis.com/v1beta/models/imagen-3.0-generate-001:generateImages"
     
-    # Get recent quiz content to avoid repetition - check ALL quiz types for words
-    recent_content = get_recent_quiz_content(quiz_results, test_type=None, last_n=10)
-    recent_words = recent_content.get("words", [])
+    headers = {
+        "Content-Type": "application/json"
+    }
     
-    level_map = {
-        "A1": "A1-A2",
-        "A2": "A2-B1",
-        "B1": "B1-B2",
-        "B2": "B2-C1",
-        "C1": "C1-C2",
-        "C2": "C2"
+    payload = {
+        "prompt": image_prompt,
+        "numberOfImages": 1,
+        "aspectRatio": "1:1",
+        "safetyFilterLevel": "block_some",
+        "personGeneration": "allow_all"
     }
-    target_level = level_map.get(current_level, "A1-A2")
     
-    # Get target language
-    target_language = get_target_language(profile)
+    logger.info("Trying Generative AI Studio endpoint...")
+    img_response = await _post_with_backoff(
+        f"{api_url_alt}?key={CONFIG.GOOGLE_API_KEY}",
+        headers=headers,
+        json=payload,
+        timeout=30
+    )
+    
+    image_base64 = None
+    if img_response.status_code == 200:
+        result = json_loads(img_response.content)
+        images = result.get('generatedImages') or result.get('images')
+        image_base64 = images[0].get('bytesBase64Encoded') if images else result.get('imageBytes')
+        if image_base64:
+            logger.info("✅ Successfully generated image via Generative AI Studio")
+            return image_base64
+    
+    if img_response.status_code == 404:
+        logger.warning("⚠️ Imagen API not available (404). Using SVG placeholder.")
+    else:
+        error_text = img_response.text[:200] if img_response.text else "Unknown error"
+        logger.warning("⚠️ API error %s: %s. Using SVG placeholder.", img_response.status_code, error_text)
+    return None
+
+def _image_mime_type(image_base64: str) -> str:
+    """Detect the image type from the start of the base64 data (JPEG when requested, PNG otherwise)."""
+    return "image/jpeg" if image_base64.startswith("/9j/") else "image/png"
+
+def generate_svg_placeholder(word: str) -> str:
+    """Generate a simple SVG placeholder image for the word, as a data URL."""
+    return _svg_placeholder(random.randrange(len(_SVG_PLACEHOLDER_PARTS)), word)
+
+@lru_cache(maxsize=256)
+def _svg_placeholder(color_index: int, word: str) -> str:
+    """Placeholder data URL for a color and word (cached, so repeated fallbacks during an Imagen outage don't re-encode)."""
+    # Only the part from the word onwards still needs base64 encoding
+    encoded_head, head_rest, tail = _SVG_PLACEHOLDER_PARTS[color_index]
+    return encoded_head + binascii.b2a_base64(head_rest + word.upper().encode('utf-8') + tail, newline=False).decode('ascii')
+
+async def _generate_image(object_word: str, english_word: str, vertex_token_task: Optional["asyncio.Task"]) -> str:
+    """
+    Generate the quiz image for a word.
+    Returns the image URL of the cached or freshly generated Imagen JPEG/PNG, or an SVG placeholder data URL if generation fails.
+    """
+    # Reuse an image already generated for the same object - the image prompt only depends on the English word
+    cached_image_id = _IMAGE_CACHE.get(english_word)
+    if cached_image_id:
+        _IMAGE_CACHE.move_to_end(english_word)
+        if vertex_token_task:
+            vertex_token_task.cancel()
+        logger.info("✅ Reusing cached image for '%s'", english_word)
+        return _image_url(cached_image_id)
+    
+    # Join an Imagen call already running for the same word instead of starting another one
+    inflight = _IMAGE_INFLIGHT.get(english_word)
+    if inflight is not None:
+        if vertex_token_task:
+            vertex_token_task.cancel()
+        logger.info("Waiting for the in-flight image for '%s'", english_word)
+        image_url = await asyncio.shield(inflight)
+        # A placeholder carries the other quiz's word, so draw our own
+        return generate_svg_placeholder(object_word) if image_url.startswith("data:image/svg") else image_url
+    
+    # Shielded, so a cancelled request doesn't cancel the image for the requests waiting on it
+    task = asyncio.ensure_future(_generate_new_image(object_word, english_word, vertex_token_task))
+    _IMAGE_INFLIGHT[english_word] = task
+    task.add_done_callback(lambda _: _IMAGE_INFLIGHT.pop(english_word, None))
+    return await asyncio.shield(task)
+
+async def _generate_new_image(object_word: str, english_word: str, vertex_token_task: Optional["asyncio.Task"]) -> str:
+    """Generate and cache a new Imagen image for the word. Returns its URL, or an SVG placeholder data URL on failure."""
+    # Generate image using Google Imagen (via Gemini)
+    # Use the ENGLISH word so the API generates the correct image
+    # Create a realistic cartoon that closely resembles the actual object
+    image_prompt = IMAGE_PROMPT_TEMPLATE.format(english_word=english_word)
+    
+    try:
+        image_base64 = None
+        
+        # Try Vertex AI Imagen API first (if project ID is configured and google-auth is installed)
+        if vertex_token_task:
+            image_base64 = await _generate_with_vertex(image_prompt, vertex_token_task)
+        
+        # Fallback: Try Generative AI Studio endpoint (if Vertex AI failed or not configured)
+        if not image_base64:
+            image_base64 = await _generate_with_ai_studio(image_prompt)
+        
+        if image_base64:
+            # Keep the decoded image server-side and hand the frontend a URL, so the quiz JSON stays small
+            image_id = _cache_image(english_word, binascii.a2b_base64(image_base64), _image_mime_type(image_base64))
+            image_url = _image_url(image_id)
+        else:
+            # If both failed, use SVG placeholder
+            image_url = generate_svg_placeholder(object_word)
+            logger.info("✅ Generated SVG placeholder for '%s'", object_word)
+        
+    except Exception as e:
+        error_msg = str(e)
+        logger.warning("⚠️ Error: %s. Using SVG placeholder.", error_msg)
+        # Fallback to SVG placeholder
+        image_url = generate_svg_placeholder(object_word)
+    
+    return image_url
+
+async def _pick_words(target_language: str, target_level: str, recent_words: List[str], count: int = 1) -> List[str]:
+    """
+    Pick object words at the level (avoiding recent_words): from the vetted word bank when there is one for the
+    level and language, otherwise from the LLM. With count > 1 the words for several quizzes come back from a single LLM call.
+    """
+    word_bank = IMAGE_DETECTION_WORDS.get((target_level, target_language))
+    if word_bank:
+        recent = {word.lower() for word in recent_words}
+        candidates = [word for word in word_bank if word not in recent]
+        if len(candidates) >= count:
+            return random.sample(candidates, count)
     
     # Get CEFR description and difficulty guidelines for the target level
     cefr_info = format_cefr_for_prompt(target_level)
     difficulty_guide = get_difficulty_guidelines(target_level)
     
-    # Step 1: LLM picks a word in target language for an object
     # Build exclusion list for recent words
     exclusion_note = ""
     if recent_words:
         recent_words_str = ", ".join(recent_words[:15])  # Show up to 15 recent words
         exclusion_note = f"\n\nCRITICAL EXCLUSION LIST - DO NOT USE THESE WORDS: {recent_words_str}\n\nYou MUST choose a COMPLETELY DIFFERENT word that:\n- Has NOT been used in ANY recent quiz (image detection, keyword match, etc.)\n- Is NOT similar in meaning to any word in the list above\n- Is a NEW, UNIQUE object that the student hasn't seen recently\n\nIf you see 'book' in the list, do NOT use 'book', 'books', 'novel', 'textbook', or any book-related word.\nIf you see 'cat' in the list, do NOT use 'cat', 'kitten', 'feline', or any cat-related word.\nChoose something COMPLETELY DIFFERENT."
     
+    # Ask for the English translation alongside each word, so the image prompt needs no separate translation call
+    if count > 1:
+        return_instruction = f"Return {count} DIFFERENT {target_language} words, one per line, each as: {target_language} word | English translation. Nothing else."
+    else:
+        return_instruction = f"Return ONLY the {target_language} word and its English translation, as: {target_language} word | English translation. Nothing else."
+    
     prompt1 = f"""Select a {target_language} word for a common, recognizable object appropriate for a student at the following CEFR level:
 
 {cefr_info}
@@ -81,27 +486,67 @@ The word MUST:
 
 IMPORTANT: Choose a word that is DIFFERENT from what the student has seen recently. Think creatively and pick something NEW and UNIQUE.
 
-Return ONLY the {target_language} word, nothing else.
+{return_instruction}
 Example for A1-A2 ({target_language}): gato, mesa, libro, manzana
 Example for B1-B2 ({target_language}): bicicleta, computadora, restaurante
 Example for C1-C2 ({target_language}): arquitectura, fenómeno, dispositivo
 
-Return the word now:"""
+Return the {"words" if count > 1 else "word"} now:"""
 
     messages1 = [
-        SystemMessage(content=f"You are a {target_language} teacher selecting vocabulary words. Respond with ONLY the {target_language} word."),
+        get_system_message(WORD_PICKER_SYSTEM_PROMPT, target_language),
         HumanMessage(content=prompt1)
     ]
     
-    response1 = await llm.ainvoke(messages1)
-    object_word = response1.content.strip().lower()
+    # Stream the answer and stop as soon as enough complete lines (one word each) have arrived
+    words = []
+    buffer = ""
+    stream = llm.astream(messages1)
+    try:
+        async for chunk in stream:
+            buffer += chunk.content
+            *lines, buffer = buffer.split("\n")
+            for line in lines:
+                _add_word(words, line, target_language)
+            if len(words) >= count:
+                break
+        else:
+            _add_word(words, buffer, target_language)
+    finally:
+        await stream.aclose()
+    if not words:
+        raise ValueError(f"Word picker returned no '{target_language} word | English translation' line")
+    return words[:count]
+
+def _add_word(words: List[str], line: str, target_language: str) -> None:
+    """
+    Clean up a "word | English translation" line from the word picker and add the word to words (skipping lines
+    without that shape, such as a preamble, and duplicates). The translation goes into the translation cache,
+    where _translate_word picks it up.
+    """
+    word_part, separator, english_part = line.partition("|")
+    if not separator:
+        return
+    # Remove any extra text and list numbering - works for most languages with basic character filtering
+    word = _clean_word(word_part.lower()).lstrip("0123456789 \t").strip()
+    if word and word not in words:
+        words.append(word)
+        english_word = _clean_word(english_part.lower()).strip()
+        if english_word:
+            _cache_translation((target_language, word), english_word)
+
+async def _translate_word(object_word: str, target_language: str) -> str:
+    """Translate an object word to English with the LLM (cached per language and word)."""
+    # English is what the image prompt needs already
+    if target_language.strip().lower() in ENGLISH_LANGUAGE_NAMES:
+        return _clean_word(object_word.lower()).strip()
     
-    # Clean up the word (remove any extra text)
-    # Works for most languages with basic character filtering
-    object_word = re.sub(r'[^\w\s]', '', object_word).strip()
+    cache_key = (target_language, object_word.lower())
+    cached_english_word = _TRANSLATION_CACHE.get(cache_key)
+    if cached_english_word:
+        _TRANSLATION_CACHE.move_to_end(cache_key)
+        return cached_english_word
     
-    # Step 2: Translate the word to English for the image generation prompt
-    # The Imagen API works best with English prompts, so we need to translate
     translation_prompt = f"""Translate this {target_language} word to English. Return ONLY the English translation, nothing else.
 
 {target_language} word: {object_word}
@@ -109,7 +554,7 @@ Return the word now:"""
 English translation:"""
 
     messages_translate = [
-        SystemMessage(content=f"You are a translator. Respond with ONLY the English word."),
+        TRANSLATOR_SYSTEM_MESSAGE,
         HumanMessage(content=translation_prompt)
     ]
     
@@ -117,270 +562,159 @@ English translation:"""
     english_word = response_translate.content.strip().lower()
     
     # Clean up the English translation
-    english_word = re.sub(r'[^\w\s]', '', english_word).strip()
+    english_word = _clean_word(english_word).strip()
+    if english_word:
+        _cache_translation(cache_key, english_word)
+    return english_word
+
+async def _create_quiz(target_language: str, target_level: str, recent_words: List[str], object_word: Optional[str] = None) -> Dict[str, str]:
+    """
+    Pick a word for the level (avoiding recent_words) unless one is given, translate it and generate its image.
+    Returns: {"object_word": ..., "image_url": ...}
+    """
+    # Resolve Vertex AI credentials in a worker thread while the LLM picks and translates the word
+    vertex_token_task = None
+    if CONFIG.GOOGLE_PROJECT_ID and GOOGLE_AUTH_AVAILABLE:
+        vertex_token_task = asyncio.create_task(asyncio.to_thread(_get_vertex_access_token))
     
-    print(f"[Image Gen] Translating '{object_word}' ({target_language}) to '{english_word}' (English) for image generation")
+    try:
+        # Step 1: Pick a word in target language for an object (word bank or LLM)
+        if object_word is None:
+            object_word = (await _pick_words(target_language, target_level, recent_words))[0]
+        
+        # Step 2: Translate the word to English for the image generation prompt
+        # The Imagen API works best with English prompts, so we need to translate (word bank words come with their translation)
+        word_bank = IMAGE_DETECTION_WORDS.get((target_level, target_language))
+        if word_bank and object_word in word_bank:
+            english_word = word_bank[object_word]
+        else:
+            english_word = await _translate_word(object_word, target_language)
+    except BaseException:
+        # Steps 1-2 failed or were cancelled, so the token will never be used
+        if vertex_token_task:
+            vertex_token_task.cancel()
+        raise
+    
+    logger.info("Translating '%s' (%s) to '%s' (English) for image generation", object_word, target_language, english_word)
     
     # Step 3: Generate image using Google Imagen (via Gemini)
     # Use the ENGLISH word so the API generates the correct image
-    # Create a realistic cartoon that closely resembles the actual object
-    image_prompt = f"""A realistic cartoon illustration of a {english_word}, inspired by Duolingo's art style but maintaining accurate representation and close resemblance to the real object.
+    image_url = await _generate_image(object_word, english_word, vertex_token_task)
+    
+    return {
+        "object_word": object_word,
+        "image_url": image_url
+    }
 
-CRITICAL REQUIREMENTS:
-- The {english_word} MUST be immediately recognizable and accurately represent the real object
-- Maintain realistic proportions, key features, and defining characteristics of the {english_word}
-- The object should closely resemble its real-world appearance (colors, shape, structure)
-- Prioritize accuracy and recognizability over stylization
+async def pregenerate_image_detection(session_id: str, target_language: str, target_level: str, recent_words: List[str], object_word: Optional[str] = None) -> None:
+    """Generate the session's next image detection quiz in the background and store it in session["pregenerated_image_detection"]."""
+    session = get_session(session_id)
+    try:
+        quiz = await _create_quiz(target_language, target_level, recent_words, object_word)
+        session["pregenerated_image_detection"] = {
+            **quiz,
+            "target_language": target_language,
+            "difficulty": target_level
+        }
+        logger.info("Pre-generated image detection quiz for session %s", session_id)
+    except Exception as e:
+        logger.warning("Pre-generation failed: %s", e)
 
-Style requirements (without compromising realism):
-- Cartoon style inspired by Duolingo characters - friendly and approachable
-- Bright, cheerful colors that match the object's natural/typical colors
-- Soft, rounded edges while maintaining the object's actual shape
-- Clean, simple design but with all essential features visible
-- White or light neutral background
-- The {english_word} as the single, centered focus
-- No text, labels, speech bubbles, or additional objects
-- Educational quality - suitable for language learning
-- Detailed enough to be instantly identifiable
+def _image_available(image_url: str) -> bool:
+    """Whether a quiz's image can still be served (served images may have been evicted from the cache meanwhile)."""
+    return not image_url.startswith(IMAGE_URL_PREFIX) or image_url[len(IMAGE_URL_PREFIX):] in _IMAGES
 
-Balance: Make it look friendly and cartoon-like (Duolingo style) while ensuring it's a realistic, accurate representation that students can easily identify and learn from."""
+def _schedule_pregeneration(session: Dict[str, Any], session_id: str, target_language: str, target_level: str, recent_words: List[str], object_word: Optional[str] = None) -> None:
+    """Generate the session's next quiz in the background (one at a time)."""
+    task = session.get("pregenerate_image_detection_task")
+    if task is not None and not task.done():
+        return
+    session["pregenerate_image_detection_task"] = asyncio.create_task(
+        pregenerate_image_detection(session_id, target_language, target_level, recent_words, object_word)
+    )
+
+async def generate_image_detection(session_id: str) -> Dict[str, Any]:
+    """
+    Generate an image detection quiz.
+    Returns: {
+        "object_word": "word in target language",
+        "image_url": "data:image/...;base64,..." ("/api/quiz/image-detection/image/{id}" with IMAGE_DETECTION_IMAGE_URLS),
+        "image_base64": None (the image is carried by image_url),
+        "difficulty": "A1|A2|B1|B2|C1|C2"
+    }
+    """
+    session = get_session(session_id)
     
-    image_url = None
-    image_base64 = None
+    # Get user profile (read from the in-memory session rather than round-tripping through the get_profile tool's JSON)
+    profile = session.get("profile") or {}
     
-    def generate_svg_placeholder(word: str) -> str:
-        """Generate a simple SVG placeholder image for the word."""
-        # Create a colorful, educational SVG placeholder
-        colors = [
-            "#58CC02",  # Duolingo green
-            "#1CB0F6",  # Duolingo blue
-            "#FFC800",  # Duolingo yellow
-            "#FF9600",  # Orange
-            "#CE82FF",  # Purple
-        ]
-        import random
-        color = random.choice(colors)
-        
-        # Create SVG with word displayed prominently
-        svg = f'''<svg width="400" height="400" xmlns="http://www.w3.org/2000/svg">
-  <defs>
-    <linearGradient id="grad" x1="0%" y1="0%" x2="100%" y2="100%">
-      <stop offset="0%" style="stop-color:{color};stop-opacity:1" />
-      <stop offset="100%" style="stop-color:{color}88;stop-opacity:1" />
-    </linearGradient>
-  </defs>
-  <rect width="400" height="400" fill="url(#grad)" rx="20"/>
-  <circle cx="200" cy="150" r="60" fill="white" opacity="0.3"/>
-  <text x="200" y="280" font-family="Arial, sans-serif" font-size="48" font-weight="bold" 
-        fill="white" text-anchor="middle">{word.upper()}</text>
-  <text x="200" y="320" font-family="Arial, sans-serif" font-size="24" 
-        fill="white" text-anchor="middle" opacity="0.9">🖼️</text>
-</svg>'''
-        # Convert SVG to base64
-        svg_bytes = svg.encode('utf-8')
-        return base64.b64encode(svg_bytes).decode('utf-8')
+    # Get current CEFR level - prioritize user's stated level from profile
+    quiz_results = session.get("quiz_results", [])
+    current_level = get_user_level(profile, quiz_results)
     
-    try:
-        vertex_success = False
-        
-        # Try Vertex AI Imagen API first (if project ID is configured)
-        if CONFIG.GOOGLE_PROJECT_ID:
-            # Use Vertex AI endpoint
-            location = CONFIG.GOOGLE_LOCATION
-            project_id = CONFIG.GOOGLE_PROJECT_ID
-            vertex_api_url = f"https://{location}-aiplatform.googleapis.com/v1/projects/{project_id}/locations/{location}/publishers/google/models/imagen-3.0-generate-001:predict"
-            
-            # Get access token for Vertex AI
-            try:
-                import google.auth
-                from google.auth.transport.requests import Request
-                import os
-                
-                credentials = None
-                try:
-                    # Define required scopes for Vertex AI
-                    scopes = ['https://www.googleapis.com/auth/cloud-platform']
-                    
-                    # Try to use service account credentials if available
-                    if os.getenv("GOOGLE_APPLICATION_CREDENTIALS"):
-                        creds_path = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
-                        # Handle relative paths
-                        if not os.path.isabs(creds_path):
-                            server_py_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-                            creds_path = os.path.join(server_py_dir, creds_path)
-                        
-                        from google.oauth2 import service_account
-                        credentials = service_account.Credentials.from_service_account_file(
-                            creds_path,
-                            scopes=scopes
-                        )
-                        project = project_id  # Use the project ID from config
-                    else:
-                        # Try default credentials with scopes
-                        credentials, project = google.auth.default(scopes=scopes)
-                except Exception as auth_error:
-                    print(f"[Image Gen] ⚠️ Auth error: {auth_error}. Trying API key method...")
-                    credentials = None
-                
-                headers = {
-                    "Content-Type": "application/json"
-                }
-                
-                # Add authorization header
-                if credentials:
-                    if not credentials.valid:
-                        credentials.refresh(Request())
-                    headers["Authorization"] = f"Bearer {credentials.token}"
-                elif CONFIG.GOOGLE_API_KEY:
-                    # Fallback: try with API key in URL (may not work for Vertex AI)
-                    vertex_api_url = f"{vertex_api_url}?key={CONFIG.GOOGLE_API_KEY}"
-                
-                payload = {
-                    "instances": [{
-                        "prompt": image_prompt
-                    }],
-                    "parameters": {
-                        "sampleCount": 1,
-                        "aspectRatio": "1:1",
-                        "safetyFilterLevel": "BLOCK_SOME",
-                        "personGeneration": "ALLOW_ALL"
-                    }
-                }
-                
-                print(f"[Image Gen] Trying Vertex AI endpoint: {location}-aiplatform.googleapis.com")
-                img_response = requests.post(
-                    vertex_api_url,
-                    headers=headers,
-                    json=payload,
-                    timeout=30
-                )
-                
-                if img_response.status_code == 200:
-                    result = img_response.json()
-                    # Vertex AI response structure
-                    if 'predictions' in result and len(result['predictions']) > 0:
-                        prediction = result['predictions'][0]
-                        if 'bytesBase64Encoded' in prediction:
-                            image_base64 = prediction['bytesBase64Encoded']
-                        elif 'imageBytes' in prediction:
-                            image_base64 = prediction['imageBytes']
-                        elif 'image' in prediction:
-                            image_base64 = prediction['image']
-                        else:
-                            # Try to find base64 in any field
-                            for key, value in prediction.items():
-                                if isinstance(value, str) and len(value) > 100:
-                                    image_base64 = value
-                                    break
-                        
-                        if image_base64:
-                            print(f"[Image Gen] ✅ Successfully generated image via Vertex AI Imagen API")
-                            vertex_success = True
-                    else:
-                        print(f"[Image Gen] ⚠️ Vertex AI response missing predictions: {result}")
-                elif img_response.status_code == 404:
-                    print(f"[Image Gen] ⚠️ Vertex AI endpoint not found (404). Trying Generative AI Studio endpoint...")
-                else:
-                    error_text = img_response.text[:500] if img_response.text else "Unknown error"
-                    print(f"[Image Gen] ⚠️ Vertex AI error {img_response.status_code}: {error_text}")
-            except ImportError:
-                print(f"[Image Gen] ⚠️ google-auth library not installed. Install with: pip install google-auth")
-            except Exception as e:
-                print(f"[Image Gen] ⚠️ Vertex AI error: {e}")
-        
-        # Fallback: Try Generative AI Studio endpoint (if Vertex AI failed or not configured)
-        if not vertex_success:
-            api_url_alt = "https://generativelanguage.googleapis.com/v1beta/models/imagen-3.0-generate-001:generateImages"
-            
-            headers = {
-                "Content-Type": "application/json"
-            }
-            
-            payload = {
-                "prompt": image_prompt,
-                "numberOfImages": 1,
-                "aspectRatio": "1:1",
-                "safetyFilterLevel": "block_some",
-                "personGeneration": "allow_all"
-            }
-            
-            print(f"[Image Gen] Trying Generative AI Studio endpoint...")
-            img_response = requests.post(
-                f"{api_url_alt}?key={CONFIG.GOOGLE_API_KEY}",
-                headers=headers,
-                json=payload,
-                timeout=30
-            )
-            
-            if img_response.status_code == 200:
-                result = img_response.json()
-                if 'generatedImages' in result and len(result['generatedImages']) > 0:
-                    image_base64 = result['generatedImages'][0].get('bytesBase64Encoded')
-                elif 'images' in result and len(result['images']) > 0:
-                    image_base64 = result['images'][0].get('bytesBase64Encoded')
-                elif 'imageBytes' in result:
-                    image_base64 = result['imageBytes']
-                if image_base64:
-                    print(f"[Image Gen] ✅ Successfully generated image via Generative AI Studio")
-        
-        # If both failed, use SVG placeholder
-        if not image_base64:
-            if img_response and img_response.status_code == 404:
-                print(f"[Image Gen] ⚠️ Imagen API not available (404). Using SVG placeholder.")
-            elif img_response:
-                error_text = img_response.text[:200] if img_response.text else "Unknown error"
-                print(f"[Image Gen] ⚠️ API error {img_response.status_code}: {error_text}. Using SVG placeholder.")
-            else:
-                print(f"[Image Gen] ⚠️ No project ID configured. Using SVG placeholder.")
-            image_base64 = generate_svg_placeholder(object_word)
-            print(f"[Image Gen] ✅ Generated SVG placeholder for '{object_word}'")
-        
-    except ImportError:
-        print("[Image Gen] requests library not available, using SVG placeholder")
-        image_base64 = generate_svg_placeholder(object_word)
-    except Exception as e:
-        error_msg = str(e)
-        print(f"[Image Gen] ⚠️ Error: {error_msg}. Using SVG placeholder.")
-        # Fallback to SVG placeholder
-        image_base64 = generate_svg_placeholder(object_word)
+    # Get recent quiz content to avoid repetition - check ALL quiz types for words
+    recent_content = get_recent_quiz_content(quiz_results, test_type=None, last_n=10)
+    recent_words = recent_content.get("words", [])
+    
+    target_level = TARGET_LEVEL_MAP.get(current_level, "A1-A2")
+    
+    # Get target language
+    target_language = get_target_language(profile)
+    
+    # Serve the pre-generated quiz if it still matches the student's language, level and recent words
+    pregenerated = session.pop("pregenerated_image_detection", None)
+    if pregenerated and (pregenerated["target_language"] != target_language
+                         or pregenerated["difficulty"] != target_level
+                         or pregenerated["object_word"] in recent_words
+                         or not _image_available(pregenerated["image_url"])):
+        pregenerated = None
+    
+    # Prepare the next quiz in the background so its LLM + image calls are off the next request's path
+    if pregenerated:
+        quiz = pregenerated
+        _schedule_pregeneration(session, session_id, target_language, target_level, [quiz["object_word"]] + recent_words)
+    else:
+        # Pick the words for this quiz and the pre-generated next one in a single LLM call,
+        # then generate both concurrently (the next quiz's translation and image overlap with this one's)
+        words = await _pick_words(target_language, target_level, recent_words, count=2)
+        next_word = words[1] if len(words) > 1 else None
+        _schedule_pregeneration(session, session_id, target_language, target_level, [words[0]] + recent_words, next_word)
+        quiz = await _create_quiz(target_language, target_level, recent_words, words[0])
     
     return {
-        "object_word": object_word,
-        "image_url": image_url,
-        "image_base64": image_base64,
+        "object_word": quiz["object_word"],
+        "image_url": quiz["image_url"],
+        "image_base64": None,
         "difficulty": target_level,
         "original_level": current_level
     }
 
 async def validate_image_detection(session_id: str, user_answer: str, correct_word: str) -> Dict[str, Any]:
     """Validate user's answer for image detection quiz using semantic matching."""
-    from .utils import get_llm
-    from langchain_core.messages import SystemMessage, HumanMessage
-    from tools import get_profile
-    import json
-    
-    # Get target language for feedback
-    profile_str = await get_profile.ainvoke({"session_id": session_id})
-    try:
-        profile = json.loads(profile_str)
-        target_language = profile.get("target_language", "English")
-    except:
-        target_language = "English"
-    
     user_answer_clean = user_answer.strip()
     correct_word_clean = correct_word.strip()
+    correct_result = {
+        "correct": True,
+        "score": 1.0,
+        "feedback": "Correct! Well done.",
+        "user_answer": user_answer
+    }
     
-    # First check exact match (fast path)
-    if user_answer_clean.lower() == correct_word_clean.lower():
-        return {
-            "correct": True,
-            "score": 1.0,
-            "feedback": "Correct! Well done.",
-            "user_answer": user_answer
-        }
+    # Most correct answers match up to case, so try that before any normalization
+    if user_answer_clean.casefold() == correct_word_clean.casefold():
+        return correct_result
+    
+    # Then check exact match, ignoring case, accents, punctuation, a leading article and a plural ending (fast path)
+    user_key = _answer_key(user_answer_clean)
+    correct_key = _answer_key(correct_word_clean)
+    if user_key == correct_key or (len(correct_key) > 2 and user_key in (correct_key + "s", correct_key + "es")):
+        return correct_result
+    
+    # Get target language for feedback
+    profile = get_session(session_id).get("profile") or {}
+    target_language = profile.get("target_language", "English")
     
     # Use LLM for semantic matching
-    llm = get_llm()
     prompt = f"""Evaluate if the student's word is semantically equivalent to the correct word.
 
 Correct word: "{correct_word_clean}"
@@ -404,7 +738,7 @@ Respond ONLY with JSON in this exact format:
 If they are semantically equivalent, score must be >= 0.8. If not, score must be < 0.8."""
 
     messages = [
-        SystemMessage(content=f"You are a vocabulary evaluator for {target_language}. Evaluate semantic equivalence, not exact word matches."),
+        get_system_message(VALIDATOR_SYSTEM_PROMPT, target_language),
         HumanMessage(content=prompt)
     ]
     
@@ -412,15 +746,8 @@ If they are semantically equivalent, score must be >= 0.8. If not, score must be
         response = await llm.ainvoke(messages)
         content = response.content.strip()
         
-        # Parse JSON from response
-        if content.startswith("```json"):
-            content = content[7:]
-        elif content.startswith("```"):
-            content = content[3:]
-        if content.endswith("```"):
-            content = content[:-3].strip()
-        
-        result = json.loads(content)
+        # Parse JSON from response (strip a surrounding ```json fence if present)
+        result = json_loads(_JSON_FENCE_RE.sub('', content))
         semantically_equivalent = result.get("semantically_equivalent", False)
         score = float(result.get("score", 0.0))
         reason = result.get("reason", "")
@@ -444,7 +771,7 @@ If they are semantically equivalent, score must be >= 0.8. If not, score must be
                 "user_answer": user_answer
             }
     except Exception as e:
-        print(f"[Quiz Val] Error in semantic validation: {e}")
+        validation_logger.warning("Error in semantic validation: %s", e)
         # Fallback to exact match check
         return {
             "correct": False,
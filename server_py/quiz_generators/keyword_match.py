@@ -1,30 +1,119 @@
 """Keyword match quiz generator."""
-from typing import Dict, Any
-from langchain_core.messages import SystemMessage, HumanMessage
-import json
-import re
-from .utils import get_llm, get_user_level, get_target_language, get_recent_quiz_content
+from typing import Dict, Any, List, Tuple, AsyncIterator, Union
+from langchain_core.messages import HumanMessage
+from pydantic import BaseModel, Field
+from .utils import get_llm, get_user_level, get_target_language, get_recent_quiz_content, get_system_message, quiz_cache_key, get_cached_quiz_response, cache_quiz_response, TARGET_LEVEL_MAP
 from .cefr_utils import format_cefr_for_prompt, get_difficulty_guidelines
-from tools import get_profile, get_session
+from tools import get_session
+
+class Pair(BaseModel):
+    """One vocabulary pair."""
+    target: str = Field(description="The word in the target language")
+    english: str = Field(description="Its English translation")
+
+class KeywordPairs(BaseModel):
+    """The vocabulary pairs for a matching exercise."""
+    pairs: List[Pair] = Field(description="Exactly 5 word pairs")
 
 llm = get_llm()
+# The pairs come back as a validated KeywordPairs via tool calling, so there's no text format to parse
+structured_llm = llm.with_structured_output(KeywordPairs)
+
+# System prompts
+GENERATOR_SYSTEM_PROMPT = "You are a {target_language} language teacher creating vocabulary matching exercises."
 
-async def generate_keyword_match(session_id: str) -> Dict[str, Any]:
+async def generate_keyword_match(session_id: str, stream: bool = False) -> Union[Dict[str, Any], AsyncIterator[Dict[str, Any]]]:
     """
     Generate a keyword match quiz with 5 target language-English word pairs.
     Returns: {
         "pairs": [{"spanish": "...", "english": "..."}, ...],  # Note: "spanish" key contains target language word
         "difficulty": "A1|A2|B1|B2|C1|C2"
     }
+    With stream=True, returns an async iterator instead (see stream_keyword_match).
+    """
+    if stream:
+        return stream_keyword_match(session_id)
+    return (await generate_keyword_match_batch([session_id]))[0]
+
+async def generate_keyword_match_batch(session_ids: List[str]) -> List[Dict[str, Any]]:
+    """
+    Generate keyword match quizzes for several sessions, sending all the prompts in one batched LLM call.
+    Returns one quiz per session, in order (same format as generate_keyword_match).
+    """
+    prepared = [_build_keyword_match_prompt(session_id) for session_id in session_ids]
+    sessions = [get_session(session_id) for session_id in session_ids]
+    cache_keys = [quiz_cache_key(messages) for messages, _, _, _ in prepared]
+    
+    # Only prompts without a recent cached result go to the model
+    results = [get_cached_quiz_response(key, session) for key, session in zip(cache_keys, sessions)]
+    misses = [i for i, result in enumerate(results) if result is None]
+    if misses:
+        fresh = await structured_llm.abatch([prepared[i][0] for i in misses], return_exceptions=True)
+        for i, result in zip(misses, fresh):
+            results[i] = result
+            if not isinstance(result, Exception) and len(_to_pairs(result)) >= 5:
+                cache_quiz_response(cache_keys[i], result, sessions[i])
+    
+    quizzes = []
+    for (_, target_language, target_level, current_level), result in zip(prepared, results):
+        if isinstance(result, Exception):
+            print(f"[Keyword Match] Warning: Structured output failed for {target_language}: {result}")
+            result = None
+        quizzes.append(_build_quiz(_to_pairs(result), target_language, target_level, current_level))
+    return quizzes
+
+async def stream_keyword_match(session_id: str) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Generate a keyword match quiz, yielding each pair as soon as the model has finished writing it.
+    Yields {"pair": {"spanish": "...", "english": "..."}} events, then a final {"quiz": {...}} event
+    (same format as generate_keyword_match).
     """
+    messages, target_language, target_level, current_level = _build_keyword_match_prompt(session_id)
+    session = get_session(session_id)
+    cache_key = quiz_cache_key(messages)
+    
+    result = get_cached_quiz_response(cache_key, session)
+    sent = 0
+    if result is None:
+        async for partial in structured_llm.astream(messages):
+            result = partial
+            # The last pair of a partial result may still be mid-word; only earlier ones are final
+            done_pairs = _to_pairs(partial)[:-1]
+            for pair in done_pairs[sent:5]:
+                yield {"pair": pair}
+            sent = max(sent, min(len(done_pairs), 5))
+        if len(_to_pairs(result)) >= 5:
+            cache_quiz_response(cache_key, result, session)
+    
+    pairs = _to_pairs(result)
+    for pair in pairs[sent:5]:
+        yield {"pair": pair}
+    yield {"quiz": _build_quiz(pairs, target_language, target_level, current_level)}
+
+def _to_pairs(result) -> List[Dict[str, str]]:
+    """Convert a (possibly partial) KeywordPairs result into the frontend pair format."""
+    return [
+        {"spanish": pair.target.strip(), "english": pair.english.strip()}  # Keep "spanish" key for backward compatibility with frontend
+        for pair in (result.pairs if result else [])
+        if pair.target.strip()
+    ]
+
+def _build_quiz(pairs: List[Dict[str, str]], target_language: str, target_level: str, current_level: str) -> Dict[str, Any]:
+    """Assemble the quiz dict from the parsed pairs."""
+    if len(pairs) < 5:
+        print(f"[Keyword Match] Warning: Only found {len(pairs)} pairs for {target_language}, may need fallback")
+    return {
+        "pairs": pairs[:5],  # Ensure exactly 5 pairs
+        "difficulty": target_level,
+        "original_level": current_level
+    }
+
+def _build_keyword_match_prompt(session_id: str) -> Tuple[list, str, str, str]:
+    """Build the generator messages for a session. Returns (messages, target_language, target_level, current_level)."""
     session = get_session(session_id)
     
     # Get user profile for personalization
-    profile_str = await get_profile.ainvoke({"session_id": session_id})
-    try:
-        profile = json.loads(profile_str)
-    except:
-        profile = {}
+    profile = session.get("profile") or {}
     
     # Get current CEFR level - prioritize user's stated level from profile
     quiz_results = session.get("quiz_results", [])
@@ -35,15 +124,7 @@ async def generate_keyword_match(session_id: str) -> Dict[str, Any]:
     recent_words = recent_content.get("words", [])
     
     # Generate level slightly above (10% harder)
-    level_map = {
-        "A1": "A1-A2",
-        "A2": "A2-B1",
-        "B1": "B1-B2",
-        "B2": "B2-C1",
-        "C1": "C1-C2",
-        "C2": "C2"
-    }
-    target_level = level_map.get(current_level, "A1-A2")
+    target_level = TARGET_LEVEL_MAP.get(current_level, "A1-A2")
     
     # Build prompt for LLM
     interests = profile.get("interests", "")
@@ -88,72 +169,15 @@ Requirements:
 
 IMPORTANT: Choose words that are COMPLETELY DIFFERENT from what the student has seen recently. Think creatively and pick NEW, UNIQUE vocabulary.
 
-Format your response EXACTLY like this:
-WORD1_{target_language.upper()}: [word in {target_language}]
-WORD1_ENGLISH: word in English
-
-WORD2_{target_language.upper()}: [word in {target_language}]
-WORD2_ENGLISH: word in English
-
-(Continue for all 5 pairs)
-
-Example for A1-A2 ({target_language}):
-[Provide 5 {target_language}-English word pairs appropriate for A1-A2 level]
+Return each pair with "target" set to the {target_language} word and "english" set to its English translation.
 
 Generate 5 pairs now for {target_level} level:"""
 
     messages = [
-        SystemMessage(content=f"You are a {target_language} language teacher creating vocabulary matching exercises. Always respond in the exact format requested."),
+        get_system_message(GENERATOR_SYSTEM_PROMPT, target_language),
         HumanMessage(content=prompt)
     ]
-    
-    response = await llm.ainvoke(messages)
-    content = response.content
-    
-    # Parse the response
-    pairs = []
-    lines = content.split('\n')
-    
-    # Look for language-specific labels (e.g., WORD1_SPANISH:, WORD1_FRENCH:, etc.)
-    lang_label = target_language.upper()
-    current_target_word = None
-    for line in lines:
-        line = line.strip()
-        if line.startswith('WORD') and f'_{lang_label}:' in line:
-            # Extract target language word
-            parts = line.split(':', 1)
-            if len(parts) == 2:
-                current_target_word = parts[1].strip()
-        elif line.startswith('WORD') and '_ENGLISH:' in line:
-            # Extract English word
-            parts = line.split(':', 1)
-            if len(parts) == 2 and current_target_word:
-                english = parts[1].strip()
-                pairs.append({
-                    "spanish": current_target_word,  # Keep "spanish" key for backward compatibility with frontend
-                    "english": english
-                })
-                current_target_word = None
-    
-    # Fallback: try to parse if format is slightly different
-    if len(pairs) < 5:
-        # Try alternative parsing - look for any word: word patterns
-        alt_pairs = re.findall(r'(\w+)\s*:\s*(\w+)', content)
-        for word1, word2 in alt_pairs[:10]:  # Check more pairs in case format is different
-            if len(pairs) < 5:
-                # Assume first is target language, second is English
-                pairs.append({"spanish": word1.strip(), "english": word2.strip()})
-    
-    # Ensure we have 5 pairs (fallback with generic words - this is a last resort)
-    if len(pairs) < 5:
-        print(f"[Keyword Match] Warning: Only found {len(pairs)} pairs for {target_language}, may need fallback")
-        # The LLM should generate proper pairs in the requested format
-    
-    return {
-        "pairs": pairs[:5],  # Ensure exactly 5 pairs
-        "difficulty": target_level,
-        "original_level": current_level
-    }
+    return messages, target_language, target_level, current_level
 
 async def validate_keyword_match(session_id: str, matches: list) -> Dict[str, Any]:
     """
@@ -184,30 +208,25 @@ async def validate_keyword_match(session_id: str, matches: list) -> Dict[str, An
         }
     
     # Create a mapping of correct pairs (case-insensitive)
-    correct_map = {}
-    for pair in original_pairs:
-        key = pair["spanish"].lower().strip()
-        correct_map[key] = pair["english"].lower().strip()
+    correct_map = {pair["spanish"].lower().strip(): pair["english"].lower().strip() for pair in original_pairs}
     
-    # Validate each match
+    # Validate each match (normalize and look up once per match)
     results = []
     correct_count = 0
     
     for match in matches:
-        spanish = match.get("spanish", "").lower().strip()
-        english = match.get("english", "").lower().strip()
-        
-        correct_english = correct_map.get(spanish, "")
-        is_correct = (english == correct_english) if correct_english else False
+        spanish_raw = match.get("spanish", "")
+        english_raw = match.get("english", "")
         
-        if is_correct:
-            correct_count += 1
+        correct_english = correct_map.get(spanish_raw.lower().strip(), "")
+        is_correct = bool(correct_english) and english_raw.lower().strip() == correct_english
+        correct_count += is_correct
         
         results.append({
-            "spanish": match.get("spanish", ""),
-            "english": match.get("english", ""),
+            "spanish": spanish_raw,
+            "english": english_raw,
             "is_correct": is_correct,
-            "correct_english": correct_map.get(spanish, "") if not is_correct else None
+            "correct_english": None if is_correct else correct_english
         })
     
     total = len(results)
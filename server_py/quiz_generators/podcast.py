@@ -1,17 +1,17 @@
 """Podcast quiz generator."""
 from typing import Dict, Any
-from langchain_core.messages import SystemMessage, HumanMessage
+from langchain_core.messages import HumanMessage
 import json
 import re
+import asyncio
 import random
 import os
-import tempfile
-import subprocess
-import shutil
 import base64
-from .utils import get_llm, get_user_level, get_target_language
+from collections import deque, OrderedDict
+from functools import lru_cache
+from .utils import get_llm, get_user_level, get_target_language, get_system_message, normalize_answer, quiz_cache_key, get_cached_quiz_response, cache_quiz_response, TARGET_LEVEL_MAP
 from .cefr_utils import format_cefr_for_prompt, get_difficulty_guidelines
-from tools import get_profile, get_session
+from tools import get_session
 
 # Google TTS imports
 try:
@@ -23,6 +23,59 @@ except ImportError:
 
 llm = get_llm()
 
+# Google TTS client, created on first use and reused so the gRPC channel and credentials are loaded once per process
+_tts_client = None
+
+def _get_tts_client():
+    """Get the shared TextToSpeechClient, creating it on first use (raises if no credentials are available)."""
+    global _tts_client
+    if _tts_client is None:
+        _tts_client = texttospeech.TextToSpeechClient()
+    return _tts_client
+
+# Audio settings shared by every synthesized turn
+_AUDIO_CFG = texttospeech.AudioConfig(
+    audio_encoding=texttospeech.AudioEncoding.MP3,
+    speaking_rate=1.0,
+    pitch=0.0,
+) if GOOGLE_TTS_AVAILABLE else None
+
+@lru_cache(maxsize=64)
+def _voice_params(language_code: str, name: str):
+    """Get the (cached) VoiceSelectionParams for a language code and voice name."""
+    return texttospeech.VoiceSelectionParams(language_code=language_code, name=name)
+
+# Fallback podcast topics (English names - adapted to target language by the LLM)
+PODCAST_TOPICS = ["sports", "food", "travel", "music", "movies", "books", "animals", "technology"]
+# Number of most recent fallback topics excluded from the next pick
+RECENT_TOPICS_WINDOW = 3
+
+# Finished podcasts shared across students with the same prompt (see utils.cache_quiz_response). Each entry
+# carries ~100 KB+ of base64 MP3, so this gets its own small bound instead of the shared 2048-entry cache.
+PODCAST_CACHE_MAXSIZE = 32
+_PODCAST_CACHE: "OrderedDict[str, tuple]" = OrderedDict()
+
+# System prompts
+GENERATOR_SYSTEM_PROMPT = "You are a {target_language} teacher creating listening comprehension exercises. Follow the format exactly."
+VALIDATOR_SYSTEM_PROMPT = "You are an answer evaluator for {target_language}. Evaluate semantic equivalence, not exact word matches."
+
+# Patterns for parsing the generated podcast (compiled once, with the same flags the parser always used)
+_CONVERSATION_RE = re.compile(r'CONVERSATION:\s*(.*?)(?=QUESTION:|$)', re.DOTALL | re.IGNORECASE)
+_PERSONA_CONVERSATION_RE = re.compile(r'(Persona\s+A:.*?)(?=QUESTION:|$)', re.DOTALL | re.IGNORECASE)
+_TRAILING_QA_LABEL_RE = re.compile(r'\s*(QUESTION|ANSWER):.*$', re.IGNORECASE)
+_CONVERSATION_LABEL_RE = re.compile(r'^CONVERSATION:\s*', re.IGNORECASE)
+_HTML_TAG_RE = re.compile(r'<[^>]+>')
+_QUESTION_RE = re.compile(r'QUESTION:\s*(.+?)(?=ANSWER:|$)', re.DOTALL | re.IGNORECASE)
+_PREGUNTA_RE = re.compile(r'PREGUNTA:\s*(.+?)(?=RESPUESTA:|ANSWER:|$)', re.DOTALL | re.IGNORECASE)
+_TRAILING_ANSWER_LABEL_RE = re.compile(r'\s*ANSWER:.*$', re.IGNORECASE)
+_ANSWER_RE = re.compile(r'ANSWER:\s*(.+?)(?:\n\n|\n$|$)', re.DOTALL | re.IGNORECASE)
+_RESPUESTA_RE = re.compile(r'RESPUESTA:\s*(.+?)(?:\n\n|\n$|$)', re.DOTALL | re.IGNORECASE)
+_QUOTED_RE = re.compile(r'["\']([^"\']+)["\']')
+_ANY_QUESTION_RE = re.compile(r'([^?\n]+[?])')
+_WORD_AFTER_ANSWER_RE = re.compile(r'ANSWER[:\s]+(\w+)', re.IGNORECASE)
+# Speaker turn in the audio script ("HOST_X: text")
+_HOST_TURN_RE = re.compile(r"^(HOST_[A-Z]+):\s*(.+)$")
+
 async def generate_podcast(session_id: str) -> Dict[str, Any]:
     """
     Generate a podcast conversation and question.
@@ -36,26 +89,14 @@ async def generate_podcast(session_id: str) -> Dict[str, Any]:
     """
     session = get_session(session_id)
     
-    # Get user profile
-    profile_str = await get_profile.ainvoke({"session_id": session_id})
-    try:
-        profile = json.loads(profile_str)
-    except:
-        profile = {}
+    # Get user profile (held in the session, no tool round-trip needed)
+    profile = session.get("profile") or {}
     
     # Get current CEFR level - prioritize user's stated level from profile
     quiz_results = session.get("quiz_results", [])
     current_level = get_user_level(profile, quiz_results)
     
-    level_map = {
-        "A1": "A1-A2",
-        "A2": "A2-B1",
-        "B1": "B1-B2",
-        "B2": "B2-C1",
-        "C1": "C1-C2",
-        "C2": "C2"
-    }
-    target_level = level_map.get(current_level, "A1-A2")
+    target_level = TARGET_LEVEL_MAP.get(current_level, "A1-A2")
     
     # Get interests or use random topic
     interests = profile.get("interests", "")
@@ -63,9 +104,13 @@ async def generate_podcast(session_id: str) -> Dict[str, Any]:
     if isinstance(interests, list):
         interests = ", ".join(interests) if interests else ""
     if not interests or (isinstance(interests, str) and interests.strip() == ""):
-        # Use English topic names - they'll be adapted to target language by the LLM
-        topics = ["sports", "food", "travel", "music", "movies", "books", "animals", "technology"]
-        interests = random.choice(topics)
+        # Skip the last few topics so podcasts don't repeat the same theme back-to-back
+        recent_topics = session.setdefault("recent_topics", deque(maxlen=RECENT_TOPICS_WINDOW))
+        topics = [t for t in PODCAST_TOPICS if t not in recent_topics] or PODCAST_TOPICS
+        # Seed per session and quiz count: varied across quizzes, reproducible for a given user state
+        rng = random.Random(session_id + str(len(quiz_results)))
+        interests = rng.choice(topics)
+        recent_topics.append(interests)
     
     # Get target language
     target_language = get_target_language(profile)
@@ -113,10 +158,17 @@ IMPORTANT: Do NOT include any HTML tags, audio elements, or markdown. Just plain
 Generate now:"""
 
     messages = [
-        SystemMessage(content=f"You are a {target_language} teacher creating listening comprehension exercises. Follow the format exactly."),
+        get_system_message(GENERATOR_SYSTEM_PROMPT, target_language),
         HumanMessage(content=prompt)
     ]
     
+    # Another student with the same prompt may have generated this podcast recently (saves the LLM and TTS calls)
+    cache_key = quiz_cache_key(messages)
+    cached_podcast = get_cached_quiz_response(cache_key, session, _PODCAST_CACHE)
+    if cached_podcast:
+        print(f"[Podcast Gen] Serving cached podcast for {target_language} {target_level}")
+        return dict(cached_podcast)
+    
     response = await llm.ainvoke(messages)
     content = response.content
     
@@ -129,45 +181,45 @@ Generate now:"""
     answer = ""
     
     # Extract conversation - try multiple patterns
-    conv_match = re.search(r'CONVERSATION:\s*(.*?)(?=QUESTION:|$)', content, re.DOTALL | re.IGNORECASE)
+    conv_match = _CONVERSATION_RE.search(content)
     if not conv_match:
         # Try without the label, look for Persona A/B pattern
-        conv_match = re.search(r'(Persona\s+A:.*?)(?=QUESTION:|$)', content, re.DOTALL | re.IGNORECASE)
+        conv_match = _PERSONA_CONVERSATION_RE.search(content)
     
     if conv_match:
         conversation = conv_match.group(1).strip()
         # Clean up any trailing ANSWER or QUESTION labels that might have been captured
-        conversation = re.sub(r'\s*(QUESTION|ANSWER):.*$', '', conversation, flags=re.IGNORECASE)
+        conversation = _TRAILING_QA_LABEL_RE.sub('', conversation)
         # Strip any HTML tags (including audio tags) that LLM might have added
-        conversation = re.sub(r'<[^>]+>', '', conversation)
+        conversation = _HTML_TAG_RE.sub('', conversation)
     else:
         # Fallback: try to extract everything before QUESTION as conversation
         q_pos = content.find('QUESTION:')
         if q_pos > 0:
             conversation = content[:q_pos].strip()
             # Remove CONVERSATION: label if present
-            conversation = re.sub(r'^CONVERSATION:\s*', '', conversation, flags=re.IGNORECASE)
+            conversation = _CONVERSATION_LABEL_RE.sub('', conversation)
             # Strip any HTML tags
-            conversation = re.sub(r'<[^>]+>', '', conversation)
+            conversation = _HTML_TAG_RE.sub('', conversation)
     
     # Extract question
-    q_match = re.search(r'QUESTION:\s*(.+?)(?=ANSWER:|$)', content, re.DOTALL | re.IGNORECASE)
+    q_match = _QUESTION_RE.search(content)
     if not q_match:
         # Try alternative pattern
-        q_match = re.search(r'PREGUNTA:\s*(.+?)(?=RESPUESTA:|ANSWER:|$)', content, re.DOTALL | re.IGNORECASE)
+        q_match = _PREGUNTA_RE.search(content)
     
     if q_match:
         question = q_match.group(1).strip()
         # Clean up any trailing ANSWER label
-        question = re.sub(r'\s*ANSWER:.*$', '', question, flags=re.IGNORECASE)
+        question = _TRAILING_ANSWER_LABEL_RE.sub('', question)
         # Strip any HTML tags
-        question = re.sub(r'<[^>]+>', '', question)
+        question = _HTML_TAG_RE.sub('', question)
     
     # Extract answer
-    a_match = re.search(r'ANSWER:\s*(.+?)(?:\n\n|\n$|$)', content, re.DOTALL | re.IGNORECASE)
+    a_match = _ANSWER_RE.search(content)
     if not a_match:
         # Try alternative pattern
-        a_match = re.search(r'RESPUESTA:\s*(.+?)(?:\n\n|\n$|$)', content, re.DOTALL | re.IGNORECASE)
+        a_match = _RESPUESTA_RE.search(content)
     
     if a_match:
         answer = a_match.group(1).strip()
@@ -177,7 +229,7 @@ Generate now:"""
             # Try to find the key word (take first word, or if answer contains quotes, extract that)
             if '"' in answer or "'" in answer:
                 # Extract quoted word if present
-                quoted_match = re.search(r'["\']([^"\']+)["\']', answer)
+                quoted_match = _QUOTED_RE.search(answer)
                 if quoted_match:
                     answer = quoted_match.group(1).strip()
                 else:
@@ -203,17 +255,17 @@ Generate now:"""
             if conv_lines:
                 conversation = '\n'.join(conv_lines[:7])  # Max 7 sentences
                 # Strip any HTML tags
-                conversation = re.sub(r'<[^>]+>', '', conversation)
+                conversation = _HTML_TAG_RE.sub('', conversation)
         
         if not question:
             # Look for any question mark
-            q_match = re.search(r'([^?\n]+[?])', content)
+            q_match = _ANY_QUESTION_RE.search(content)
             if q_match:
                 question = q_match.group(1).strip()
         
         if not answer:
             # Look for single word after ANSWER
-            words_after_answer = re.findall(r'ANSWER[:\s]+(\w+)', content, re.IGNORECASE)
+            words_after_answer = _WORD_AFTER_ANSWER_RE.findall(content)
             if words_after_answer:
                 answer = words_after_answer[0]
     
@@ -234,7 +286,7 @@ Generate now:"""
             print(f"[Podcast Gen] Audio generation failed: {e}")
             # Continue without audio - text will still be available
     
-    return {
+    podcast = {
         "conversation": conversation,
         "question": question,
         "answer": answer.lower().strip(),
@@ -244,6 +296,10 @@ Generate now:"""
         "audio_url": audio_url,
         "audio_base64": audio_base64
     }
+    # Only share complete podcasts (a transient TTS failure shouldn't be served to other students)
+    if audio_base64 or not GOOGLE_TTS_AVAILABLE:
+        cache_quiz_response(cache_key, podcast, session, _PODCAST_CACHE, PODCAST_CACHE_MAXSIZE)
+    return dict(podcast)
 
 async def generate_audio_from_conversation(conversation: str, target_language: str) -> Dict[str, Any]:
     """
@@ -259,9 +315,8 @@ async def generate_audio_from_conversation(conversation: str, target_language: s
         # We don't need GOOGLE_APPLICATION_CREDENTIALS file path - ADC will work
         # Try to initialize the client - it will use ADC if available
         try:
-            # Test if we can create a client (will use ADC in Cloud Run)
-            test_client = texttospeech.TextToSpeechClient()
-            del test_client  # Clean up test client
+            # Create (or reuse) the shared client (will use ADC in Cloud Run)
+            client = _get_tts_client()
         except Exception as e:
             # If ADC fails, check for explicit credentials file (for local dev)
             if not os.getenv("GOOGLE_APPLICATION_CREDENTIALS"):
@@ -377,101 +432,69 @@ async def generate_audio_from_conversation(conversation: str, target_language: s
             if not line:
                 continue
             # Match "HOST_X: text" pattern
-            m = re.match(r"^(HOST_[A-Z]+):\s*(.+)$", line)
+            m = _HOST_TURN_RE.match(line)
             if m:
                 speaker, utterance = m.group(1), m.group(2)
-                turns.append((speaker, utterance))
+                if turns and turns[-1][0] == speaker:
+                    # Same voice keeps talking: fold into the previous turn so it costs one TTS request
+                    turns[-1] = (speaker, f"{turns[-1][1]} <pause/> {utterance}")
+                else:
+                    turns.append((speaker, utterance))
         
         if not turns:
             print("[Podcast Gen] No valid speaker turns found in conversation")
             return {"audio_url": None, "audio_base64": None}
         
-        # Initialize TTS client
-        client = texttospeech.TextToSpeechClient()
-        temp_files = []
+        client = _get_tts_client()
         
-        with tempfile.TemporaryDirectory() as tmpdir:
-            # Synthesize each turn
-            for i, (speaker, utterance) in enumerate(turns, 1):
-                voice_cfg = VOICE_MAP.get(speaker, VOICE_MAP["HOST_A"])
-                
-                synthesis_input = texttospeech.SynthesisInput(ssml=to_ssml(utterance))
-                
-                voice = texttospeech.VoiceSelectionParams(
-                    language_code=voice_cfg["language_code"],
-                    name=voice_cfg["name"],
-                )
-                audio_cfg = texttospeech.AudioConfig(
-                    audio_encoding=texttospeech.AudioEncoding.MP3,
-                    speaking_rate=1.0,
-                    pitch=0.0,
+        def synthesize_turn(speaker: str, utterance: str):
+            """Synthesize one speaker turn (blocking; runs in a worker thread)."""
+            voice_cfg = VOICE_MAP.get(speaker, VOICE_MAP["HOST_A"])
+            
+            synthesis_input = texttospeech.SynthesisInput(ssml=to_ssml(utterance))
+            
+            voice = _voice_params(voice_cfg["language_code"], voice_cfg["name"])
+            audio_cfg = _AUDIO_CFG
+            
+            try:
+                audio = client.synthesize_speech(
+                    input=synthesis_input, voice=voice, audio_config=audio_cfg
                 )
-                
-                try:
-                    audio = client.synthesize_speech(
-                        input=synthesis_input, voice=voice, audio_config=audio_cfg
-                    )
-                except Exception as voice_error:
-                    # If voice fails, try falling back to other voice types
-                    error_str = str(voice_error).lower()
-                    if "does not exist" in error_str or "invalid" in error_str or "not found" in error_str:
-                        print(f"[Podcast Gen] Voice {voice_cfg['name']} failed, trying fallback voices...")
-                        
-                        # Special handling for Urdu: try ur-IN if ur-PK was used
-                        if lang_code == "ur-PK":
+            except Exception as voice_error:
+                # If voice fails, try falling back to other voice types
+                error_str = str(voice_error).lower()
+                if "does not exist" in error_str or "invalid" in error_str or "not found" in error_str:
+                    print(f"[Podcast Gen] Voice {voice_cfg['name']} failed, trying fallback voices...")
+                    
+                    # Special handling for Urdu: try ur-IN if ur-PK was used
+                    if lang_code == "ur-PK":
+                        try:
+                            ur_in_voice = _voice_params("ur-IN", voice_cfg['name'].replace("ur-PK", "ur-IN"))
+                            audio = client.synthesize_speech(
+                                input=synthesis_input,
+                                voice=ur_in_voice,
+                                audio_config=audio_cfg
+                            )
+                            print(f"[Podcast Gen] ✅ Fallback to ur-IN locale succeeded")
+                        except Exception as ur_in_error:
+                            print(f"[Podcast Gen] ur-IN fallback also failed: {ur_in_error}")
+                    
+                    # Try Standard voice as fallback (if not already Standard)
+                    if "-Standard-" not in voice_cfg['name']:
+                        fallback_voice_name = voice_cfg['name'].replace("-Neural2-", "-Standard-").replace("-Wavenet-", "-Standard-")
+                        try:
+                            fallback_voice = _voice_params(lang_code, fallback_voice_name)
+                            audio = client.synthesize_speech(
+                                input=synthesis_input,
+                                voice=fallback_voice,
+                                audio_config=audio_cfg
+                            )
+                            print(f"[Podcast Gen] ✅ Fallback to {fallback_voice_name} succeeded")
+                        except Exception as fallback_error:
+                            # Try Wavenet as last resort
+                            wavenet_voice_name = voice_cfg['name'].replace("-Neural2-", "-Wavenet-").replace("-Standard-", "-Wavenet-")
                             try:
-                                ur_in_voice = texttospeech.VoiceSelectionParams(
-                                    language_code="ur-IN",
-                                    name=voice_cfg['name'].replace("ur-PK", "ur-IN"),
-                                )
-                                audio = client.synthesize_speech(
-                                    input=synthesis_input,
-                                    voice=ur_in_voice,
-                                    audio_config=audio_cfg
-                                )
-                                print(f"[Podcast Gen] ✅ Fallback to ur-IN locale succeeded")
-                            except Exception as ur_in_error:
-                                print(f"[Podcast Gen] ur-IN fallback also failed: {ur_in_error}")
-                        
-                        # Try Standard voice as fallback (if not already Standard)
-                        if "-Standard-" not in voice_cfg['name']:
-                            fallback_voice_name = voice_cfg['name'].replace("-Neural2-", "-Standard-").replace("-Wavenet-", "-Standard-")
-                            try:
-                                fallback_voice = texttospeech.VoiceSelectionParams(
-                                    language_code=lang_code,
-                                    name=fallback_voice_name,
-                                )
-                                audio = client.synthesize_speech(
-                                    input=synthesis_input,
-                                    voice=fallback_voice,
-                                    audio_config=audio_cfg
-                                )
-                                print(f"[Podcast Gen] ✅ Fallback to {fallback_voice_name} succeeded")
-                            except Exception as fallback_error:
-                                # Try Wavenet as last resort
-                                wavenet_voice_name = voice_cfg['name'].replace("-Neural2-", "-Wavenet-").replace("-Standard-", "-Wavenet-")
-                                try:
-                                    wavenet_voice = texttospeech.VoiceSelectionParams(
-                                        language_code=lang_code,
-                                        name=wavenet_voice_name,
-                                    )
-                                    audio = client.synthesize_speech(
-                                        input=synthesis_input,
-                                        voice=wavenet_voice,
-                                        audio_config=audio_cfg
-                                    )
-                                    print(f"[Podcast Gen] ✅ Fallback to {wavenet_voice_name} succeeded")
-                                except Exception as final_error:
-                                    print(f"[Podcast Gen] ❌ All voice attempts failed for {lang_code}: {final_error}")
-                                    raise voice_error  # Re-raise original error
-                        else:
-                            # Already tried Standard, try Wavenet
-                            wavenet_voice_name = voice_cfg['name'].replace("-Standard-", "-Wavenet-")
-                            try:
-                                wavenet_voice = texttospeech.VoiceSelectionParams(
-                                    language_code=lang_code,
-                                    name=wavenet_voice_name,
-                                )
+                                wavenet_voice = _voice_params(lang_code, wavenet_voice_name)
                                 audio = client.synthesize_speech(
                                     input=synthesis_input,
                                     voice=wavenet_voice,
@@ -482,75 +505,42 @@ async def generate_audio_from_conversation(conversation: str, target_language: s
                                 print(f"[Podcast Gen] ❌ All voice attempts failed for {lang_code}: {final_error}")
                                 raise voice_error  # Re-raise original error
                     else:
-                        raise  # Re-raise if it's not a voice name error
-                
-                # Write temp file
-                tmpfile = os.path.join(tmpdir, f"turn_{i}.mp3")
-                with open(tmpfile, "wb") as f:
-                    f.write(audio.audio_content)
-                temp_files.append(tmpfile)
-            
-            # Concatenate using ffmpeg
-            concat_file = os.path.join(tmpdir, "concat_list.txt")
-            with open(concat_file, "w") as f:
-                for tf in temp_files:
-                    # Use forward slashes for ffmpeg even on Windows
-                    f.write(f"file '{tf.replace(chr(92), '/')}'\n")
-            
-            # Find ffmpeg
-            ffmpeg_path = shutil.which("ffmpeg")
-            if not ffmpeg_path:
-                # Try common winget installation path
-                winget_base = os.path.join(os.environ.get("LOCALAPPDATA", ""), 
-                                           "Microsoft", "WinGet", "Packages")
-                if os.path.exists(winget_base):
-                    for item in os.listdir(winget_base):
-                        if "FFmpeg" in item:
-                            ffmpeg_dir = os.path.join(winget_base, item)
-                            for subdir in os.listdir(ffmpeg_dir):
-                                if subdir.startswith("ffmpeg-") and subdir.endswith("-full_build"):
-                                    bin_path = os.path.join(ffmpeg_dir, subdir, "bin", "ffmpeg.exe")
-                                    if os.path.exists(bin_path):
-                                        ffmpeg_path = bin_path
-                                        break
-                            if ffmpeg_path:
-                                break
-            
-            if not ffmpeg_path:
-                print("[Podcast Gen] ffmpeg not found, cannot concatenate audio")
-                # Return first file as fallback if only one turn
-                if len(temp_files) == 1:
-                    with open(temp_files[0], "rb") as f:
-                        audio_data = f.read()
-                    return {
-                        "audio_url": None,
-                        "audio_base64": base64.b64encode(audio_data).decode('utf-8')
-                    }
-                return {"audio_url": None, "audio_base64": None}
-            
-            # Concatenate audio files
-            output_file = os.path.join(tmpdir, "podcast_audio.mp3")
-            subprocess.run([
-                ffmpeg_path, "-f", "concat", "-safe", "0",
-                "-i", concat_file,
-                "-c", "copy",
-                "-y",
-                output_file
-            ], check=True, capture_output=True, text=True)
-            
-            # Read the concatenated audio file
-            with open(output_file, "rb") as f:
-                audio_data = f.read()
-            
-            # Convert to base64 for embedding
-            audio_base64 = base64.b64encode(audio_data).decode('utf-8')
-            
-            print(f"[Podcast Gen] ✅ Generated audio: {len(audio_data)} bytes, {len(turns)} turns")
-            
-            return {
-                "audio_url": None,  # Could be saved to a public URL in production
-                "audio_base64": audio_base64
-            }
+                        # Already tried Standard, try Wavenet
+                        wavenet_voice_name = voice_cfg['name'].replace("-Standard-", "-Wavenet-")
+                        try:
+                            wavenet_voice = _voice_params(lang_code, wavenet_voice_name)
+                            audio = client.synthesize_speech(
+                                input=synthesis_input,
+                                voice=wavenet_voice,
+                                audio_config=audio_cfg
+                            )
+                            print(f"[Podcast Gen] ✅ Fallback to {wavenet_voice_name} succeeded")
+                        except Exception as final_error:
+                            print(f"[Podcast Gen] ❌ All voice attempts failed for {lang_code}: {final_error}")
+                            raise voice_error  # Re-raise original error
+                else:
+                    raise  # Re-raise if it's not a voice name error
+
+            return audio
+        
+        # Synthesize all turns concurrently (each call is a blocking network round-trip)
+        audios = await asyncio.gather(*(
+            asyncio.to_thread(synthesize_turn, speaker, utterance)
+            for speaker, utterance in turns
+        ))
+        
+        # Google TTS returns bare MP3 frames, which are self-synchronizing, so the turns can be joined byte-for-byte
+        audio_data = b"".join(audio.audio_content for audio in audios)
+        
+        # Convert to base64 for embedding
+        audio_base64 = base64.b64encode(audio_data).decode('utf-8')
+        
+        print(f"[Podcast Gen] ✅ Generated audio: {len(audio_data)} bytes, {len(turns)} turns")
+        
+        return {
+            "audio_url": None,  # Could be saved to a public URL in production
+            "audio_base64": audio_base64
+        }
     
     except Exception as e:
         print(f"[Podcast Gen] Audio generation error: {e}")
@@ -560,29 +550,21 @@ async def generate_audio_from_conversation(conversation: str, target_language: s
 
 async def validate_podcast(session_id: str, user_answer: str, correct_answer: str) -> Dict[str, Any]:
     """Validate user's answer for podcast quiz using semantic matching."""
-    from .utils import get_llm
-    from langchain_core.messages import SystemMessage, HumanMessage
-    from tools import get_profile
-    
-    # Get target language for feedback
-    profile_str = await get_profile.ainvoke({"session_id": session_id})
-    try:
-        profile = json.loads(profile_str)
-        target_language = profile.get("target_language", "English")
-    except:
-        target_language = "English"
-    
     user_answer_clean = user_answer.strip()
     correct_answer_clean = correct_answer.strip()
     
-    # First check exact match (fast path)
-    if user_answer_clean.lower() == correct_answer_clean.lower():
+    # First check exact match, ignoring case and accents (fast path)
+    if normalize_answer(user_answer_clean) == normalize_answer(correct_answer_clean):
         return {
             "correct": True,
             "score": 1.0,
             "feedback": "Correct! Well done."
         }
     
+    # Get target language for feedback (only needed for the LLM path)
+    profile = get_session(session_id).get("profile") or {}
+    target_language = profile.get("target_language", "English")
+    
     # Use LLM for semantic matching
     llm = get_llm()
     prompt = f"""Evaluate if the student's answer is semantically equivalent to the correct answer.
@@ -607,7 +589,7 @@ Respond ONLY with JSON in this exact format:
 If they are semantically equivalent, score must be >= 0.8. If not, score must be < 0.8."""
 
     messages = [
-        SystemMessage(content=f"You are an answer evaluator for {target_language}. Evaluate semantic equivalence, not exact word matches."),
+        get_system_message(VALIDATOR_SYSTEM_PROMPT, target_language),
         HumanMessage(content=prompt)
     ]
     
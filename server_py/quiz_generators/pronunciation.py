@@ -1,17 +1,120 @@
 """Pronunciation quiz generator."""
-from typing import Dict, Any
-from langchain_core.messages import SystemMessage, HumanMessage
+from typing import Dict, Any, Callable
+from langchain_core.messages import HumanMessage
 import json
 import re
-import tempfile
+import asyncio
+import io
 import os
 import subprocess
-import shutil
-from .utils import get_llm, get_user_level, get_target_language
+import threading
+from functools import lru_cache
+from .utils import get_llm, get_user_level, get_target_language, get_recent_quiz_content, get_system_message, find_ffmpeg, json_loads, TARGET_LEVEL_MAP
 from .cefr_utils import format_cefr_for_prompt, get_difficulty_guidelines
 from tools import get_profile, get_session
 
-llm = get_llm()
+# A single practice sentence - never needs more than a few dozen tokens
+llm = get_llm(max_tokens=60)
+
+# System prompts
+GENERATOR_SYSTEM_PROMPT = "You are a {target_language} teacher creating pronunciation exercises. Respond with ONLY the {target_language} sentence."
+
+@lru_cache(maxsize=4)
+def get_speech_config(azure_key: str, azure_region: str):
+    """Get the Azure SpeechConfig for a key and region, shared by every pronunciation request that uses them."""
+    import azure.cognitiveservices.speech as speechsdk
+    return speechsdk.SpeechConfig(subscription=azure_key, region=azure_region)
+
+# In-process audio decoding (PyAV) - avoids spawning an ffmpeg process per request
+try:
+    import av
+    AV_AVAILABLE = True
+except ImportError:
+    AV_AVAILABLE = False
+    print("[Pronunciation Warning] PyAV not available. Audio will be converted with the ffmpeg binary.")
+
+# Bytes of PCM pushed to Azure per write while ffmpeg is still decoding
+PCM_CHUNK_SIZE = 4096
+
+def _decode_with_av(audio_data: bytes, push: Callable[[bytes], None]) -> None:
+    """Decode and resample to 16 kHz 16-bit mono PCM in-process, pushing each frame as it is decoded."""
+    with av.open(io.BytesIO(audio_data)) as container:
+        resampler = av.AudioResampler(format="s16", layout="mono", rate=16000)
+        for frame in container.decode(audio=0):
+            for out in resampler.resample(frame):
+                # Plane buffers can be padded - keep only the real samples (2 bytes each)
+                push(bytes(out.planes[0])[:out.samples * 2])
+        # Flush samples buffered inside the resampler
+        for out in resampler.resample(None):
+            push(bytes(out.planes[0])[:out.samples * 2])
+
+def _feed_stdin(proc: subprocess.Popen, audio_data: bytes) -> None:
+    """Write the uploaded audio to ffmpeg's stdin (separate thread so stdout can drain meanwhile)."""
+    try:
+        proc.stdin.write(audio_data)
+    except (BrokenPipeError, OSError):
+        pass
+    finally:
+        try:
+            proc.stdin.close()
+        except OSError:
+            pass
+
+def _decode_with_ffmpeg(audio_data: bytes, push: Callable[[bytes], None]) -> None:
+    """Decode to 16 kHz 16-bit mono PCM through ffmpeg pipes, pushing chunks as ffmpeg produces them."""
+    ffmpeg_path = find_ffmpeg()
+    if not ffmpeg_path:
+        print("[Audio Conversion Warning] ffmpeg not found, using original format")
+        return
+    proc = subprocess.Popen([
+        ffmpeg_path, "-i", "pipe:0",
+        "-f", "s16le",
+        "-acodec", "pcm_s16le",
+        "-ar", "16000",
+        "-ac", "1",
+        "pipe:1"
+    ], stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    feeder = threading.Thread(target=_feed_stdin, args=(proc, audio_data), daemon=True)
+    feeder.start()
+    produced = False
+    while chunk := proc.stdout.read(PCM_CHUNK_SIZE):
+        push(chunk)
+        produced = True
+    feeder.join()
+    if proc.wait() != 0 and not produced:
+        raise subprocess.CalledProcessError(proc.returncode, ffmpeg_path)
+
+def pump_audio_to_stream(audio_data: bytes, stream) -> None:
+    """
+    Decode uploaded audio (WebM) to raw 16 kHz 16-bit mono PCM and push it into an Azure
+    PushAudioInputStream as it is decoded, so recognition starts before decoding finishes.
+    Decodes in-process with PyAV when available, otherwise through the ffmpeg binary.
+    Falls back to pushing the original bytes if both are unavailable or fail. Always closes the stream.
+    """
+    written = False
+    
+    def push(chunk: bytes) -> None:
+        nonlocal written
+        stream.write(chunk)
+        written = True
+    
+    try:
+        if AV_AVAILABLE:
+            try:
+                _decode_with_av(audio_data, push)
+            except Exception as av_e:
+                if written:
+                    raise
+                print(f"[Audio Conversion Warning] PyAV decode failed ({av_e}), trying ffmpeg")
+        if not written:
+            _decode_with_ffmpeg(audio_data, push)
+    except Exception as conv_e:
+        print(f"[Audio Conversion Warning] {conv_e}, using original format")
+        # Continue with original audio if conversion fails
+    finally:
+        if not written:
+            stream.write(audio_data)
+        stream.close()
 
 async def generate_pronunciation(session_id: str) -> Dict[str, Any]:
     """
@@ -35,19 +138,10 @@ async def generate_pronunciation(session_id: str) -> Dict[str, Any]:
     current_level = get_user_level(profile, quiz_results)
     
     # Get recent quiz content to avoid repetition
-    from .utils import get_recent_quiz_content
     recent_content = get_recent_quiz_content(quiz_results, test_type="pronunciation", last_n=10)
     recent_sentences = recent_content.get("sentences", [])
     
-    level_map = {
-        "A1": "A1-A2",
-        "A2": "A2-B1",
-        "B1": "B1-B2",
-        "B2": "B2-C1",
-        "C1": "C1-C2",
-        "C2": "C2"
-    }
-    target_level = level_map.get(current_level, "A1-A2")
+    target_level = TARGET_LEVEL_MAP.get(current_level, "A1-A2")
     
     # Get interests for personalization
     interests = profile.get("interests", "")
@@ -97,7 +191,7 @@ Examples ({target_language}):
 Generate the sentence now:"""
 
     messages = [
-        SystemMessage(content=f"You are a {target_language} teacher creating pronunciation exercises. Respond with ONLY the {target_language} sentence."),
+        get_system_message(GENERATOR_SYSTEM_PROMPT, target_language),
         HumanMessage(content=prompt)
     ]
     
@@ -131,8 +225,6 @@ async def validate_pronunciation(session_id: str, audio_data: bytes, reference_t
     }
     """
     # Get target language for pronunciation assessment
-    from tools import get_profile
-    import json
     profile_str = await get_profile.ainvoke({"session_id": session_id})
     try:
         profile = json.loads(profile_str)
@@ -170,57 +262,15 @@ async def validate_pronunciation(session_id: str, audio_data: bytes, reference_t
             "error": "AZURE_SPEECH_KEY not configured"
         }
     
-    # Save audio to temporary file (WebM format)
-    input_ext = '.webm'
-    with tempfile.NamedTemporaryFile(delete=False, suffix=input_ext) as tmp_input:
-        tmp_input.write(audio_data)
-        tmp_input_path = tmp_input.name
-    
-    # Convert to WAV using ffmpeg if needed (Azure Speech SDK prefers WAV)
-    tmp_file_path = tmp_input_path
-    try:
-        if input_ext == '.webm':
-            # Convert WebM to WAV using ffmpeg
-            tmp_wav_path = tmp_input_path.replace('.webm', '.wav')
-            ffmpeg_path = shutil.which("ffmpeg")
-            if not ffmpeg_path:
-                # Try common winget installation path
-                winget_base = os.path.join(os.environ.get("LOCALAPPDATA", ""), 
-                                           "Microsoft", "WinGet", "Packages")
-                if os.path.exists(winget_base):
-                    for item in os.listdir(winget_base):
-                        if "FFmpeg" in item:
-                            ffmpeg_dir = os.path.join(winget_base, item)
-                            for subdir in os.listdir(ffmpeg_dir):
-                                if subdir.startswith("ffmpeg-") and subdir.endswith("-full_build"):
-                                    bin_path = os.path.join(ffmpeg_dir, subdir, "bin", "ffmpeg.exe")
-                                    if os.path.exists(bin_path):
-                                        ffmpeg_path = bin_path
-                                        break
-                            if ffmpeg_path:
-                                break
-            
-            if ffmpeg_path:
-                subprocess.run([
-                    ffmpeg_path, "-i", tmp_input_path,
-                    "-acodec", "pcm_s16le",
-                    "-ar", "16000",
-                    "-ac", "1",
-                    "-y",
-                    tmp_wav_path
-                ], check=True, capture_output=True)
-                tmp_file_path = tmp_wav_path
-                # Delete original WebM file
-                os.unlink(tmp_input_path)
-    except Exception as conv_e:
-        print(f"[Audio Conversion Warning] {conv_e}, using original format")
-        # Continue with original file if conversion fails
-    
     try:
         import azure.cognitiveservices.speech as speechsdk
         
-        speech_config = speechsdk.SpeechConfig(subscription=azure_key, region=azure_region)
-        audio_config = speechsdk.audio.AudioConfig(filename=tmp_file_path)
+        speech_config = get_speech_config(azure_key, azure_region)
+        # Stream PCM from memory as it is decoded (PyAV in-process, else the ffmpeg binary) - no temp files
+        stream = speechsdk.audio.PushAudioInputStream(
+            stream_format=speechsdk.audio.AudioStreamFormat(samples_per_second=16000, bits_per_sample=16, channels=1)
+        )
+        audio_config = speechsdk.audio.AudioConfig(stream=stream)
         
         pron_cfg = speechsdk.PronunciationAssessmentConfig(
             reference_text=reference_text,
@@ -231,7 +281,25 @@ async def validate_pronunciation(session_id: str, audio_data: bytes, reference_t
         
         rec = speechsdk.SpeechRecognizer(speech_config=speech_config, audio_config=audio_config, language=speech_language)
         pron_cfg.apply_to(rec)
-        result = rec.recognize_once()
+        # Open the service connection up front so the handshake overlaps audio decoding
+        speechsdk.Connection.from_recognizer(rec).open(False)
+        # Start recognition first so Azure consumes audio while it is still being decoded;
+        # both the pump and the blocking future.get() run off the event loop
+        result_future = rec.recognize_once_async()
+        await asyncio.to_thread(pump_audio_to_stream, audio_data, stream)
+        result = await asyncio.to_thread(result_future.get)
+        
+        # Nothing to assess if no speech was recognized (no match / canceled)
+        if result.reason != speechsdk.ResultReason.RecognizedSpeech:
+            print(f"[Pronunciation] No speech recognized: {result.reason}")
+            return {
+                "accuracy_score": 0.0,
+                "fluency_score": 0.0,
+                "completeness_score": 0.0,
+                "pronunciation_score": 0.0,
+                "json_result": {},
+                "error": f"no-speech: {result.reason}"
+            }
         
         assessment = speechsdk.PronunciationAssessmentResult(result)
         
@@ -244,9 +312,9 @@ async def validate_pronunciation(session_id: str, audio_data: bytes, reference_t
         
         # Parse JSON result for detailed breakdown
         json_result = {}
-        if hasattr(assessment, 'json_result') and assessment.json_result:
+        if assessment.json_result:
             try:
-                json_result = json.loads(assessment.json_result)
+                json_result = json_loads(assessment.json_result)
             except:
                 pass
         
@@ -270,10 +338,3 @@ async def validate_pronunciation(session_id: str, audio_data: bytes, reference_t
             "json_result": {},
             "error": str(e)
         }
-    finally:
-        # Clean up temporary file
-        try:
-            os.unlink(tmp_file_path)
-        except:
-            pass
-
@@ -1,90 +1,171 @@
 """Reading comprehension quiz generator."""
-from typing import Dict, Any
-from langchain_core.messages import SystemMessage, HumanMessage
+from typing import Dict, Any, List, Tuple, AbstractSet
+from collections import OrderedDict
+from langchain_core.messages import HumanMessage
 import json
 import re
 import feedparser
 import random
-from .utils import get_llm, get_user_level, get_target_language
+import time
+import asyncio
+from functools import lru_cache
+from .utils import get_llm, get_user_level, get_target_language, get_system_message, json_loads, get_http_client
 from .cefr_utils import format_cefr_for_prompt, get_difficulty_guidelines
 from tools import get_profile, get_session
 
-llm = get_llm()
-
-async def generate_reading(session_id: str) -> Dict[str, Any]:
+# Short SCORE/FEEDBACK/EXPLANATION evaluation (the translation's cap depends on level and script, see translation_max_tokens)
+validation_llm = get_llm(temperature=0.3, max_tokens=200)
+
+# Longest translated article the prompt allows per level, in words, plus room for the TITLE and QUESTION
+READING_MAX_WORDS = {"A1": 150, "A2": 200, "B1": 300, "B2": 300, "C1": 400, "C2": 400}
+READING_EXTRA_WORDS = 80
+# Output tokens per word: Latin-script languages stay around 2, other scripts (Devanagari, Bengali,
+# Arabic, Cyrillic, Han) cost several tokens per word on the cl100k tokenizer
+LATIN_SCRIPT_LANGUAGES = frozenset({"English", "Spanish", "French", "German", "Italian", "Portuguese"})
+LATIN_TOKENS_PER_WORD = 2
+OTHER_TOKENS_PER_WORD = 8
+# Upper bound for the one retry after a cut-off translation
+READING_MAX_TOKENS_CEILING = 4096
+# finish_reason values reported when a response hits its token cap (OpenAI, Gemini)
+_TRUNCATED_FINISH_REASONS = frozenset({"length", "MAX_TOKENS"})
+# Cap for re-asking only the question when a translation comes back without one
+QUESTION_MAX_TOKENS = 200
+# Articles tried for a live quiz before giving up (each one that can't be translated within the cap is skipped)
+READING_ARTICLE_ATTEMPTS = 2
+
+# System prompts
+TRANSLATE_SYSTEM_PROMPT = "You are a {target_language} teacher translating articles for language learners and writing reading comprehension questions about them. Follow the format exactly."
+QUESTION_SYSTEM_PROMPT = "You are a {target_language} teacher writing reading comprehension questions for language learners. Respond with ONLY the question."
+VALIDATOR_SYSTEM_PROMPT = "You are a {target_language} teacher evaluating reading comprehension answers. Evaluate based on semantic meaning, not exact word matches. Follow the format exactly."
+
+# Precompiled patterns for article cleanup and LLM response parsing
+# A run of HTML tags and whitespace; group 1 is set if the run contains any whitespace
+_TAGS_AND_WHITESPACE_RE = re.compile(r'(?:(\s)|<[^>]+>)+')
+_WHITESPACE_RE = re.compile(r'\s+')
+_TITLE_RE = re.compile(r'TITLE:\s*(.+?)(?=TEXT:|$)', re.DOTALL | re.IGNORECASE)
+_TEXT_RE = re.compile(r'TEXT:\s*(.+?)(?=QUESTION:|$)', re.DOTALL | re.IGNORECASE)
+_QUESTION_RE = re.compile(r'QUESTION:\s*(.+)', re.DOTALL | re.IGNORECASE)
+_QUESTION_LABEL_RE = re.compile(r'^QUESTION:\s*', re.IGNORECASE)
+_SCORE_RE = re.compile(r'SCORE:\s*(\d+(?:\.\d+)?)', re.IGNORECASE)
+_FEEDBACK_RE = re.compile(r'FEEDBACK:\s*(.+?)(?=EXPLANATION:|$)', re.DOTALL | re.IGNORECASE)
+_EXPLANATION_RE = re.compile(r'EXPLANATION:\s*(.+)', re.DOTALL | re.IGNORECASE)
+
+# Translated article + question per (article URL, target language, CEFR level), least recently used first
+READING_CACHE_MAXSIZE = 256
+_READING_CACHE: "OrderedDict[Tuple[str, str, str], Dict[str, str]]" = OrderedDict()
+
+# BBC Sport RSS feed, refetched at most every RSS_CACHE_TTL seconds and with a conditional GET
+RSS_URL = "https://feeds.bbci.co.uk/sport/rss.xml"
+RSS_CACHE_TTL = 300
+_RSS_CACHE: Dict[str, Any] = {"etag": None, "modified": None, "entries": [], "ts": 0.0}
+
+async def fetch_rss_entries() -> list:
     """
-    Generate a reading comprehension test from BBC Sport RSS feed.
-    Returns: {
-        "article_title": "translated title",
-        "article_text": "translated text in target language",
-        "question": "comprehension question in target language",
-        "difficulty": "A1|A2|B1|B2|C1|C2",
-        "original_url": "original article URL"
-    }
+    Get the BBC Sport RSS entries, reusing the cached copy while it is fresh.
+    Fetched over the shared keep-alive HTTP client with ETag/Last-Modified, so an
+    unchanged feed comes back as 304 with no body.
     """
-    session = get_session(session_id)
+    now = time.time()
+    if _RSS_CACHE["entries"] and now - _RSS_CACHE["ts"] < RSS_CACHE_TTL:
+        return _RSS_CACHE["entries"]
     
-    # Get user profile
-    profile_str = await get_profile.ainvoke({"session_id": session_id})
-    try:
-        profile = json.loads(profile_str)
-    except:
-        profile = {}
+    headers = {}
+    if _RSS_CACHE["etag"]:
+        headers["If-None-Match"] = _RSS_CACHE["etag"]
+    if _RSS_CACHE["modified"]:
+        headers["If-Modified-Since"] = _RSS_CACHE["modified"]
+    # feedparser followed redirects on its own; the shared client does not by default
+    response = await get_http_client().get(RSS_URL, headers=headers, follow_redirects=True)
+    if response.status_code == 304:
+        # Unchanged - keep serving the previous entries
+        _RSS_CACHE["ts"] = now
+        return _RSS_CACHE["entries"]
+    response.raise_for_status()
     
-    # Get current CEFR level - prioritize user's stated level from profile
-    quiz_results = session.get("quiz_results", [])
-    current_level = get_user_level(profile, quiz_results)
+    # Parsing is CPU-bound - keep it off the event loop
+    feed = await asyncio.to_thread(feedparser.parse, response.content)
+    if not feed.entries:
+        _RSS_CACHE["ts"] = now
+        return _RSS_CACHE["entries"]
     
-    # For reading comprehension, use the exact level (don't push higher) to ensure appropriate difficulty
-    # A1 students should get A1-level content, not A1-A2
-    level_map = {
-        "A1": "A1",  # Keep at A1 for reading - it's already challenging
-        "A2": "A2",  # Keep at A2
-        "B1": "B1",
-        "B2": "B2",
-        "C1": "C1",
-        "C2": "C2"
-    }
-    target_level = level_map.get(current_level, "A1")
+    _RSS_CACHE.update({
+        "etag": response.headers.get("ETag"),
+        "modified": response.headers.get("Last-Modified"),
+        "entries": feed.entries,
+        "ts": now
+    })
+    return feed.entries
+
+# For reading comprehension, use the exact level (don't push higher) to ensure appropriate difficulty
+# A1 students should get A1-level content, not A1-A2
+READING_LEVEL_MAP = {
+    "A1": "A1",  # Keep at A1 for reading - it's already challenging
+    "A2": "A2",  # Keep at A2
+    "B1": "B1",
+    "B2": "B2",
+    "C1": "C1",
+    "C2": "C2"
+}
+
+# Fallback article when the RSS feed is unavailable: (title, summary, url)
+FALLBACK_ARTICLE = (
+    "Man City wins Premier League match",
+    "Manchester City defeated their opponents 2-1 in an exciting Premier League match. The team played well and scored two goals in the second half.",
+    "https://www.bbc.com/sport/football"
+)
+# Reading quizzes translated ahead of time per session, in one batched LLM request
+# (only for sessions that have already taken a reading quiz, so one-off readers cost a single translation)
+PREGENERATED_READING_COUNT = 1
+
+def pick_articles(feed_entries: list, count: int = 1, exclude_urls: AbstractSet[str] = frozenset()) -> List[Tuple[str, str, str]]:
+    """Pick up to `count` distinct random articles as (title, cleaned summary, url), skipping `exclude_urls`."""
+    total = len(feed_entries)
+    picked: Dict[int, Any] = {}
     
-    # Step 1: Fetch and parse BBC Sport RSS feed
-    rss_url = "https://feeds.bbci.co.uk/sport/rss.xml"
-    try:
-        feed = feedparser.parse(rss_url)
-        entries = [e for e in feed.entries if hasattr(e, 'title') and hasattr(e, 'summary')]
-        if not entries:
-            raise ValueError("No entries found in RSS feed")
-        
-        # Pick a random article
-        article = random.choice(entries)
+    def try_pick(idx: int) -> None:
+        article = feed_entries[idx]
+        if (idx not in picked and getattr(article, 'title', '') and getattr(article, 'summary', '')
+                and article.get('link', '') not in exclude_urls):
+            picked[idx] = article
+    
+    # Index the feed directly - nearly every entry has a title and summary, so a few random
+    # probes are enough and no filtered copy of the feed is built
+    for _ in range(count * 3):
+        if len(picked) == count or not total:
+            break
+        try_pick(random.randrange(total))
+    if len(picked) < min(count, total):
+        # Unlucky probes - scan the rest in random order
+        for idx in random.sample(range(total), total):
+            if len(picked) == count:
+                break
+            try_pick(idx)
+    if not picked:
+        raise ValueError("No entries found in RSS feed")
+    
+    articles = []
+    for article in picked.values():
         original_title = article.get('title', '')
         original_summary = article.get('summary', '')
         original_url = article.get('link', '')
         
-        # Clean HTML tags from summary
-        original_summary = re.sub(r'<[^>]+>', '', original_summary)
-        original_summary = re.sub(r'\s+', ' ', original_summary).strip()
+        # Clean HTML tags from summary and collapse whitespace in a single pass
+        original_summary = _TAGS_AND_WHITESPACE_RE.sub(lambda m: ' ' if m.group(1) else '', original_summary).strip()
         
-        # Limit article length (first 500 words max for summary)
-        words = original_summary.split()
+        # Limit article length (first 500 words max for summary) - stop splitting after 500 words
+        words = original_summary.split(None, 500)
         if len(words) > 500:
             original_summary = ' '.join(words[:500])
         
-    except Exception as e:
-        print(f"[RSS Error] {e}")
-        # Fallback article
-        original_title = "Man City wins Premier League match"
-        original_summary = "Manchester City defeated their opponents 2-1 in an exciting Premier League match. The team played well and scored two goals in the second half."
-        original_url = "https://www.bbc.com/sport/football"
-    
-    # Get target language
-    target_language = get_target_language(profile)
-    
+        articles.append((original_title, original_summary, original_url))
+    return articles
+
+def build_translation_messages(original_title: str, original_summary: str, target_language: str, target_level: str) -> list:
+    """Build the messages that translate an article to the student's level and write its question."""
     # Get CEFR description and difficulty guidelines for the target level
     cefr_info = format_cefr_for_prompt(target_level)
     difficulty_guide = get_difficulty_guidelines(target_level)
     
-    # Step 2: Translate article to target language at user's level
     translation_prompt = f"""Translate the following English sports news article to {target_language}, adapting it for a student at the following CEFR level:
 
 {cefr_info}
@@ -112,71 +193,265 @@ Requirements:
 - Maintain all key information and facts
 - Keep it engaging and readable at the student's exact level
 
+Then write ONE reading comprehension question about your translated article:
+- Question should be in {target_language}
+- The question complexity should match the student's language abilities as described above
+- Question should test understanding of key information from the article
+- Question should have a clear answer that can be found in the text
+- Question should be answerable with 1-3 sentences, appropriate for the student's level
+
 Format your response EXACTLY like this:
 
 TITLE: [Translated {target_language} title]
 TEXT: [Translated {target_language} article text]
+QUESTION: [Your question in {target_language}]
 
 Translate now:"""
 
-    messages_translate = [
-        SystemMessage(content=f"You are a {target_language} teacher translating articles for language learners. Follow the format exactly."),
+    return [
+        get_system_message(TRANSLATE_SYSTEM_PROMPT, target_language),
         HumanMessage(content=translation_prompt)
     ]
+
+def translation_max_tokens(target_language: str, target_level: str) -> int:
+    """Output token cap for a translated article at this level, in this language's script."""
+    tokens_per_word = LATIN_TOKENS_PER_WORD if target_language in LATIN_SCRIPT_LANGUAGES else OTHER_TOKENS_PER_WORD
+    return (READING_MAX_WORDS.get(target_level, 400) + READING_EXTRA_WORDS) * tokens_per_word
+
+@lru_cache(maxsize=16)
+def get_translation_llm(max_tokens: int):
+    """Get the (shared) translation LLM for an output token cap."""
+    return get_llm(max_tokens=max_tokens)
+
+def is_truncated(response) -> bool:
+    """Whether an LLM response was cut off at its token cap."""
+    return response.response_metadata.get("finish_reason") in _TRUNCATED_FINISH_REASONS
+
+async def translate_article(original_title: str, original_summary: str, target_language: str, target_level: str) -> Dict[str, str]:
+    """
+    Translate an article and write its question in one LLM call.
+    A response cut off at the token cap is retried once with a larger cap, then rejected (ValueError);
+    a response without a QUESTION gets its question written by a second, short call.
+    """
+    messages = build_translation_messages(original_title, original_summary, target_language, target_level)
+    max_tokens = translation_max_tokens(target_language, target_level)
+    for cap in (max_tokens, min(max_tokens * 2, READING_MAX_TOKENS_CEILING)):
+        response = await get_translation_llm(cap).ainvoke(messages)
+        if not is_truncated(response):
+            break
+        print(f"[Reading Gen] Translation to {target_language} {target_level} cut off at {cap} tokens")
+    else:
+        raise ValueError(f"Reading translation to {target_language} exceeded {cap} tokens")
     
-    response_translate = await llm.ainvoke(messages_translate)
-    translation_content = response_translate.content
-    
-    # Parse translation
-    title_match = re.search(r'TITLE:\s*(.+?)(?=TEXT:|$)', translation_content, re.DOTALL | re.IGNORECASE)
-    text_match = re.search(r'TEXT:\s*(.+)', translation_content, re.DOTALL | re.IGNORECASE)
+    reading = parse_translation(response.content, original_title, original_summary)
+    if not reading["question"]:
+        print(f"[Reading Gen] Translation to {target_language} has no QUESTION, asking for it separately")
+        reading["question"] = await write_question(reading["article_text"], target_language, target_level)
+    return reading
+
+async def write_question(article_text: str, target_language: str, target_level: str) -> str:
+    """Write the comprehension question for an already translated article. Raises ValueError if none comes back."""
+    prompt = f"""Write ONE reading comprehension question in {target_language} about this article, for a student at CEFR level {target_level}.
+The question should test understanding of key information and have a clear answer in the text.
+
+Article:
+{article_text}
+
+Respond with ONLY the question."""
+    response = await get_translation_llm(QUESTION_MAX_TOKENS).ainvoke([
+        get_system_message(QUESTION_SYSTEM_PROMPT, target_language),
+        HumanMessage(content=prompt)
+    ])
+    question = _QUESTION_LABEL_RE.sub('', response.content.strip()).strip()
+    if not question:
+        raise ValueError(f"No reading comprehension question written in {target_language}")
+    return question
+
+def parse_translation(translation_content: str, original_title: str, original_summary: str) -> Dict[str, str]:
+    """
+    Parse the TITLE/TEXT/QUESTION response, falling back to the original title and text.
+    "question" is empty if the response has none (there is no language-neutral fallback question).
+    """
+    title_match = _TITLE_RE.search(translation_content)
+    text_match = _TEXT_RE.search(translation_content)
+    q_match = _QUESTION_RE.search(translation_content)
     
     translated_title = title_match.group(1).strip() if title_match else original_title
     translated_text = text_match.group(1).strip() if text_match else original_summary
+    question = q_match.group(1).strip() if q_match else ""
     
     # Clean up
-    translated_title = re.sub(r'\n+', ' ', translated_title).strip()
-    translated_text = re.sub(r'\n+', ' ', translated_text).strip()
-    translated_text = re.sub(r'\s+', ' ', translated_text)
+    translated_title = _WHITESPACE_RE.sub(' ', translated_title).strip()
+    translated_text = _WHITESPACE_RE.sub(' ', translated_text).strip()
     
-    # Step 3: Generate comprehension question
-    question_prompt = f"""Based on the following {target_language} sports article, generate ONE reading comprehension question for a student at the following CEFR level:
-
-{cefr_info}
-
-Article Title: {translated_title}
-
-Article Text: {translated_text}
-
-Requirements:
-- Question should be in {target_language}
-- The question complexity should match the student's language abilities as described above
-- Question should test understanding of key information from the article
-- Question should have a clear answer that can be found in the text
-- Question should be answerable with 1-3 sentences, appropriate for the student's level
+    return {
+        "article_title": translated_title,
+        "article_text": translated_text,
+        "question": question
+    }
 
-Format your response EXACTLY like this:
+def _cache_reading(cache_key: Tuple[str, str, str], reading: Dict[str, str]) -> None:
+    """Store a translated article in the LRU cache, evicting the oldest entry when full."""
+    _READING_CACHE[cache_key] = reading
+    _READING_CACHE.move_to_end(cache_key)
+    if len(_READING_CACHE) > READING_CACHE_MAXSIZE:
+        _READING_CACHE.popitem(last=False)
 
-QUESTION: [Your question in {target_language}]
+async def pregenerate_reading(session_id: str, target_language: str, target_level: str, exclude_urls: AbstractSet[str]) -> None:
+    """
+    Queue the next few reading quizzes for a session in session["pregenerated_reading"], skipping
+    `exclude_urls`. Articles already in the translation cache are reused; the rest are translated
+    in a single batched LLM request.
+    """
+    session = get_session(session_id)
+    try:
+        feed_entries = await fetch_rss_entries()
+        articles = pick_articles(feed_entries, PREGENERATED_READING_COUNT, exclude_urls)
+        
+        readings: Dict[str, Dict[str, str]] = {}
+        to_translate = []
+        for title, summary, url in articles:
+            cached = _READING_CACHE.get((url, target_language, target_level))
+            if cached:
+                _READING_CACHE.move_to_end((url, target_language, target_level))
+                readings[url] = cached
+            else:
+                to_translate.append((title, summary, url))
+        
+        if to_translate:
+            translation_llm = get_translation_llm(translation_max_tokens(target_language, target_level))
+            responses = await translation_llm.abatch([
+                build_translation_messages(title, summary, target_language, target_level)
+                for title, summary, _ in to_translate
+            ])
+            for (title, summary, url), response in zip(to_translate, responses):
+                # Skip cut-off translations and ones without a question rather than queueing them
+                if is_truncated(response):
+                    continue
+                reading = parse_translation(response.content, title, summary)
+                if not reading["question"]:
+                    continue
+                _cache_reading((url, target_language, target_level), reading)
+                readings[url] = reading
+        
+        queue = session.setdefault("pregenerated_reading", [])
+        for _, _, url in articles:
+            if url in readings:
+                queue.append({
+                    **readings[url],
+                    "target_language": target_language,
+                    "difficulty": target_level,
+                    "original_url": url
+                })
+        print(f"[Reading Gen] Pre-generated reading quizzes for session {session_id}: {len(queue)} queued, {len(to_translate)} translated")
+    except Exception as e:
+        print(f"[Reading Gen] Pre-generation failed: {e}")
 
-Generate the question now:"""
+def _schedule_pregeneration(session: Dict[str, Any], session_id: str, target_language: str, target_level: str, served_url: str) -> None:
+    """
+    Refill the session's pre-generated reading queue in the background (one refill at a time),
+    avoiding the article just served and those already queued.
+    """
+    task = session.get("pregenerate_reading_task")
+    if task is not None and not task.done():
+        return
+    exclude_urls = {served_url, *(entry["original_url"] for entry in session.get("pregenerated_reading", []))}
+    session["pregenerate_reading_task"] = asyncio.create_task(
+        pregenerate_reading(session_id, target_language, target_level, exclude_urls)
+    )
 
-    messages_question = [
-        SystemMessage(content=f"You are a {target_language} teacher creating reading comprehension questions. Respond with ONLY the question in the specified format."),
-        HumanMessage(content=question_prompt)
-    ]
+async def generate_reading(session_id: str) -> Dict[str, Any]:
+    """
+    Generate a reading comprehension test from BBC Sport RSS feed.
+    Returns: {
+        "article_title": "translated title",
+        "article_text": "translated text in target language",
+        "question": "comprehension question in target language",
+        "difficulty": "A1|A2|B1|B2|C1|C2",
+        "original_url": "original article URL"
+    }
+    """
+    session = get_session(session_id)
+    
+    # Get user profile and fetch the BBC Sport RSS feed concurrently (independent I/O)
+    profile_str, feed_entries = await asyncio.gather(
+        get_profile.ainvoke({"session_id": session_id}),
+        fetch_rss_entries(),
+        return_exceptions=True
+    )
+    if isinstance(profile_str, BaseException):
+        raise profile_str
+    try:
+        profile = json_loads(profile_str)
+    except:
+        profile = {}
+    
+    # Get current CEFR level - prioritize user's stated level from profile
+    quiz_results = session.get("quiz_results", [])
+    current_level = get_user_level(profile, quiz_results)
+    
+    target_level = READING_LEVEL_MAP.get(current_level, "A1")
+    
+    # Get target language
+    target_language = get_target_language(profile)
     
-    response_question = await llm.ainvoke(messages_question)
-    question_content = response_question.content
+    # Serve a pre-generated quiz if one matches the student's current language and level
+    # (entries for an outdated language/level are dropped), then refill the queue in the background
+    queue = session.get("pregenerated_reading", [])
+    pregenerated = None
+    while queue and pregenerated is None:
+        candidate = queue.pop(0)
+        if candidate["target_language"] == target_language and candidate["difficulty"] == target_level:
+            pregenerated = candidate
+    if pregenerated:
+        if not queue:
+            _schedule_pregeneration(session, session_id, target_language, target_level, pregenerated["original_url"])
+        return {
+            "article_title": pregenerated["article_title"],
+            "article_text": pregenerated["article_text"],
+            "question": pregenerated["question"],
+            "difficulty": target_level,
+            "original_level": current_level,
+            "original_url": pregenerated["original_url"]
+        }
     
-    # Extract question
-    q_match = re.search(r'QUESTION:\s*(.+)', question_content, re.DOTALL | re.IGNORECASE)
-    question = q_match.group(1).strip() if q_match else "¿Qué ocurrió en el artículo?"
+    # Step 1: Pick an article from the BBC Sport RSS feed (another one if it can't be translated within the cap)
+    tried_urls = set()
+    reading = None
+    while reading is None:
+        try:
+            if isinstance(feed_entries, BaseException):
+                raise feed_entries
+            original_title, original_summary, original_url = pick_articles(feed_entries, 1, tried_urls)[0]
+        except Exception as e:
+            print(f"[RSS Error] {e}")
+            original_title, original_summary, original_url = FALLBACK_ARTICLE
+        tried_urls.add(original_url)
+        
+        # Reuse a previous translation of the same article for the same language and level
+        cache_key = (original_url, target_language, target_level)
+        reading = _READING_CACHE.get(cache_key)
+        if reading:
+            _READING_CACHE.move_to_end(cache_key)
+            break
+        
+        # Step 2: Translate article to target language at user's level and write the
+        # comprehension question in the same LLM call
+        try:
+            reading = await translate_article(original_title, original_summary, target_language, target_level)
+        except ValueError as e:
+            if len(tried_urls) >= READING_ARTICLE_ATTEMPTS or original_url == FALLBACK_ARTICLE[2]:
+                raise
+            print(f"[Reading Gen] {e}, trying another article")
+            continue
+        _cache_reading(cache_key, reading)
+    
+    # Only now that this quiz is ready, and only for returning readers, translate the next one in the background
+    if any(result.get("test_type") == "reading" for result in quiz_results):
+        _schedule_pregeneration(session, session_id, target_language, target_level, original_url)
     
     return {
-        "article_title": translated_title,
-        "article_text": translated_text,
-        "question": question,
+        **reading,
         "difficulty": target_level,
         "original_level": current_level,
         "original_url": original_url
@@ -225,8 +500,6 @@ EXPLANATION: [explanation of why this score, 1-2 sentences]
 Evaluate now:"""
 
     # Get target language for feedback
-    from tools import get_profile
-    import json
     profile_str = await get_profile.ainvoke({"session_id": session_id})
     try:
         profile = json.loads(profile_str)
@@ -235,11 +508,11 @@ Evaluate now:"""
         target_language = "English"
     
     messages = [
-        SystemMessage(content=f"You are a {target_language} teacher evaluating reading comprehension answers. Evaluate based on semantic meaning, not exact word matches. Follow the format exactly."),
+        get_system_message(VALIDATOR_SYSTEM_PROMPT, target_language),
         HumanMessage(content=prompt)
     ]
     
-    response = await llm.ainvoke(messages)
+    response = await validation_llm.ainvoke(messages)
     content = response.content
     
     # Parse response
@@ -247,7 +520,7 @@ Evaluate now:"""
     feedback = "Respuesta recibida."
     explanation = "Evaluación completada."
     
-    score_match = re.search(r'SCORE:\s*(\d+(?:\.\d+)?)', content, re.IGNORECASE)
+    score_match = _SCORE_RE.search(content)
     if score_match:
         try:
             score = float(score_match.group(1))
@@ -256,11 +529,11 @@ Evaluate now:"""
         except:
             pass
     
-    feedback_match = re.search(r'FEEDBACK:\s*(.+?)(?=EXPLANATION:|$)', content, re.DOTALL | re.IGNORECASE)
+    feedback_match = _FEEDBACK_RE.search(content)
     if feedback_match:
         feedback = feedback_match.group(1).strip()
     
-    explanation_match = re.search(r'EXPLANATION:\s*(.+)', content, re.DOTALL | re.IGNORECASE)
+    explanation_match = _EXPLANATION_RE.search(content)
     if explanation_match:
         explanation = explanation_match.group(1).strip()
     
@@ -1,14 +1,18 @@
 """Unit completion quiz generator."""
 from typing import Dict, Any
-from langchain_core.messages import SystemMessage, HumanMessage
+from langchain_core.messages import HumanMessage
 import json
 import re
-from .utils import get_llm, get_user_level, get_target_language, get_recent_quiz_content
+from .utils import get_llm, get_user_level, get_target_language, get_recent_quiz_content, get_system_message, TARGET_LEVEL_MAP
 from .cefr_utils import format_cefr_for_prompt, get_difficulty_guidelines
 from tools import get_profile, get_session
 
 llm = get_llm()
 
+# System prompts
+GENERATOR_SYSTEM_PROMPT = "You are a {target_language} language teacher creating sentence completion exercises. Always respond in the requested format."
+VALIDATOR_SYSTEM_PROMPT = "You are an evaluator of sentence completion exercises in {target_language}. Evaluate if the answer fits grammatically and contextually, not if it is semantically equivalent to the expected answer."
+
 async def generate_unit_completion(session_id: str) -> Dict[str, Any]:
     """
     Generate a unit completion quiz based on user's language level.
@@ -37,15 +41,7 @@ async def generate_unit_completion(session_id: str) -> Dict[str, Any]:
     recent_answers = recent_content.get("answers", [])
     
     # Generate level slightly above (10% harder)
-    level_map = {
-        "A1": "A1-A2",  # Mix A1 with some A2
-        "A2": "A2-B1",
-        "B1": "B1-B2",
-        "B2": "B2-C1",
-        "C1": "C1-C2",
-        "C2": "C2"
-    }
-    target_level = level_map.get(current_level, "A1-A2")
+    target_level = TARGET_LEVEL_MAP.get(current_level, "A1-A2")
     
     # Build prompt for LLM
     interests = profile.get("interests", "")
@@ -98,7 +94,7 @@ Example for B1-B2 ({target_language}):
 Generate the exercise now:"""
 
     messages = [
-        SystemMessage(content=f"You are a {target_language} language teacher creating sentence completion exercises. Always respond in the requested format."),
+        get_system_message(GENERATOR_SYSTEM_PROMPT, target_language),
         HumanMessage(content=prompt)
     ]
     
@@ -149,11 +145,6 @@ async def validate_unit_completion(session_id: str, user_answer: str, masked_wor
         "feedback": str
     }
     """
-    from .utils import get_llm
-    from langchain_core.messages import SystemMessage, HumanMessage
-    from tools import get_profile
-    import re
-    
     # Get target language for feedback
     profile_str = await get_profile.ainvoke({"session_id": session_id})
     try:
@@ -214,7 +205,7 @@ Respond ONLY with JSON in this exact format:
 If it is grammatically correct AND makes contextual sense, score must be >= 0.8. If not, score must be < 0.8."""
 
     messages = [
-        SystemMessage(content=f"You are an evaluator of sentence completion exercises in {target_language}. Evaluate if the answer fits grammatically and contextually, not if it is semantically equivalent to the expected answer."),
+        get_system_message(VALIDATOR_SYSTEM_PROMPT, target_language),
         HumanMessage(content=prompt)
     ]
     
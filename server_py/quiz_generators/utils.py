@@ -2,32 +2,198 @@
 import sys
 import os
 import json
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import shutil
+import unicodedata
+import bisect
+import atexit
+import logging
+import logging.handlers
+import queue
+import time
+import hashlib
+import asyncio
+from collections import OrderedDict
+import httpx
+from functools import lru_cache
+from typing import Any, Optional
+_SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _SERVER_DIR not in sys.path:
+    sys.path.insert(0, _SERVER_DIR)
 from config import CONFIG
 from langchain_openai import ChatOpenAI
 from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_core.messages import SystemMessage
 from .cefr_utils import format_cefr_for_prompt
 
-def get_llm(temperature: float = 0.8):
+# orjson parses large JSON payloads (e.g. phoneme-level Azure results) several times faster
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
+# HTTP/2 lets concurrent requests to one host (OpenAI, Vertex AI) share a connection; needs the h2 package (httpx[http2])
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Queue-backed logging: records are enqueued on the event loop and written to stdout by a listener thread (lazy initialization)
+_log_queue = None
+_log_listener = None
+
+def get_logger(tag: str) -> logging.Logger:
+    """Get a non-blocking logger whose lines print as "[tag] message", like the print() logs elsewhere."""
+    global _log_queue, _log_listener
+    if _log_listener is None:
+        _log_queue = queue.SimpleQueue()
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(logging.Formatter("[%(name)s] %(message)s"))
+        _log_listener = logging.handlers.QueueListener(_log_queue, handler)
+        _log_listener.start()
+        atexit.register(_log_listener.stop)
+    logger = logging.getLogger(tag)
+    if not logger.handlers:
+        logger.addHandler(logging.handlers.QueueHandler(_log_queue))
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
+
+# Shared async HTTP client (keep-alive connection pool) for LLM and feed requests (lazy initialization)
+_http_client = None
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get the process-wide async HTTP client, creating it on first use."""
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=32, keepalive_expiry=60),
+            timeout=httpx.Timeout(60.0, connect=10.0)
+        )
+    return _http_client
+
+async def close_http_client():
+    """Close the process-wide async HTTP client (called on server shutdown)."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+# Caps in-flight LLM requests across all quiz generators. The httpx pool limits don't: HTTP/2 multiplexes many
+# requests over one connection, and the Google client doesn't use the shared httpx client at all.
+_LLM_SEMAPHORE = asyncio.Semaphore(CONFIG.LLM_MAX_CONCURRENCY)
+
+class _LimitedChatModel:
+    """Holds _LLM_SEMAPHORE for the duration of each async generation or stream (ainvoke, structured output, astream)."""
+    async def _agenerate(self, *args, **kwargs):
+        async with _LLM_SEMAPHORE:
+            return await super()._agenerate(*args, **kwargs)
+    
+    async def _astream(self, *args, **kwargs):
+        async with _LLM_SEMAPHORE:
+            async for chunk in super()._astream(*args, **kwargs):
+                yield chunk
+
+class _LimitedChatOpenAI(_LimitedChatModel, ChatOpenAI):
+    pass
+
+class _LimitedChatGoogleGenerativeAI(_LimitedChatModel, ChatGoogleGenerativeAI):
+    pass
+
+def get_llm(temperature: float = 0.8, max_tokens: Optional[int] = None):
     """
     Initialize LLM based on provider configuration.
     
     Args:
         temperature: Temperature for generation (default 0.8 for more variation in quiz content)
+        max_tokens: Optional cap on response length (decode time grows with output tokens)
     """
     if CONFIG.PROVIDER == "google":
-        return ChatGoogleGenerativeAI(
+        return _LimitedChatGoogleGenerativeAI(
             model=CONFIG.GOOGLE_MODEL,
             temperature=temperature,
+            max_output_tokens=max_tokens,
             google_api_key=CONFIG.GOOGLE_API_KEY
         )
     else:
-        return ChatOpenAI(
+        return _LimitedChatOpenAI(
             model=CONFIG.OPENAI_MODEL,
             temperature=temperature,
-            openai_api_key=CONFIG.OPENAI_API_KEY
+            max_tokens=max_tokens,
+            openai_api_key=CONFIG.OPENAI_API_KEY,
+            http_async_client=get_http_client()
         )
 
+@lru_cache(maxsize=256)
+def get_system_message(template: str, target_language: str) -> SystemMessage:
+    """
+    Get the SystemMessage for a prompt template and target language.
+    The same instance is reused across calls, so the system prompt is sent byte-identical
+    every time and lines up with the provider's prompt prefix cache.
+    """
+    return SystemMessage(content=template.format(target_language=target_language))
+
+# Quiz LLM responses keyed by prompt fingerprint: students with the same level, language, interests and
+# recent words get the same prompt, so one generation can serve all of them for a while.
+# Modules with large responses (e.g. podcasts with audio) pass their own smaller cache and bound.
+QUIZ_RESPONSE_CACHE_MAXSIZE = 2048
+QUIZ_RESPONSE_CACHE_TTL = 3600  # seconds
+_QUIZ_RESPONSE_CACHE: "OrderedDict[str, tuple]" = OrderedDict()
+
+def quiz_cache_key(messages: list) -> str:
+    """Stable fingerprint of a quiz prompt (all message contents)."""
+    return hashlib.blake2b("\x1e".join(m.content for m in messages).encode(), digest_size=16).hexdigest()
+
+def get_cached_quiz_response(key: str, session: dict, cache: "OrderedDict[str, tuple]" = _QUIZ_RESPONSE_CACHE) -> Optional[Any]:
+    """
+    Get the cached LLM response for a quiz prompt, or None if missing or expired.
+    A response is served to each session at most once, so a student asking again gets a fresh quiz.
+    """
+    entry = cache.get(key)
+    served = session.setdefault("served_quiz_responses", set())
+    if entry is None or key in served or time.monotonic() - entry[0] > QUIZ_RESPONSE_CACHE_TTL:
+        return None
+    cache.move_to_end(key)
+    served.add(key)
+    return entry[1]
+
+def cache_quiz_response(key: str, response: Any, session: dict, cache: "OrderedDict[str, tuple]" = _QUIZ_RESPONSE_CACHE,
+                        maxsize: int = QUIZ_RESPONSE_CACHE_MAXSIZE) -> None:
+    """Store a quiz LLM response (already served to this session), evicting the oldest entries beyond `maxsize`."""
+    session.setdefault("served_quiz_responses", set()).add(key)
+    cache[key] = (time.monotonic(), response)
+    cache.move_to_end(key)
+    while len(cache) > maxsize:
+        cache.popitem(last=False)
+
+@lru_cache(maxsize=1)
+def find_ffmpeg() -> Optional[str]:
+    """
+    Locate the ffmpeg binary (PATH first, then the WinGet package directory on Windows).
+    Resolved once per process - the result is cached for every later request.
+    """
+    ffmpeg_path = shutil.which("ffmpeg")
+    if ffmpeg_path:
+        return ffmpeg_path
+    
+    # Try common winget installation path
+    winget_base = os.path.join(os.environ.get("LOCALAPPDATA", ""), "Microsoft", "WinGet", "Packages")
+    if not os.path.isdir(winget_base):
+        return None
+    with os.scandir(winget_base) as packages:
+        for package in packages:
+            if "FFmpeg" not in package.name or not package.is_dir():
+                continue
+            with os.scandir(package.path) as builds:
+                for build in builds:
+                    if build.name.startswith("ffmpeg-") and build.name.endswith("-full_build"):
+                        bin_path = os.path.join(build.path, "bin", "ffmpeg.exe")
+                        if os.path.exists(bin_path):
+                            return bin_path
+    return None
+
 def normalize_cefr_level(level_input: str) -> str:
     """
     Normalize language level input to CEFR format.
@@ -62,6 +228,16 @@ def normalize_cefr_level(level_input: str) -> str:
     # Default to A1 if unclear
     return "A1"
 
+# Accented letters -> base letter, applied in one C-level pass by str.translate
+_ACCENT_TABLE = str.maketrans("áàâäãéèêëíìîïóòôöõúùûüñç", "aaaaaeeeeiiiiooooouuuunc")
+
+def normalize_answer(text: str) -> str:
+    """Lowercase and strip accents so "Árbol" and "arbol" compare equal."""
+    if text.isascii():
+        return text.lower()
+    # Compose decomposed input first (e.g. "a" + combining acute from some keyboards), so the table applies
+    return unicodedata.normalize("NFC", text).casefold().translate(_ACCENT_TABLE)
+
 def get_target_language(profile: dict) -> str:
     """
     Get the target language from profile.
@@ -172,6 +348,28 @@ def get_recent_quiz_content(quiz_results: list, test_type: str = None, last_n: i
     
     return recent_content
 
+# CEFR levels in order, and the average quiz score at which each level above A1 starts
+CEFR_LEVELS = ["A1", "A2", "B1", "B2", "C1", "C2"]
+LEVEL_SCORE_THRESHOLDS = [0.5, 0.6, 0.7, 0.85, 0.9]
+# Quiz difficulty per user level - mix in the next level up so quizzes stretch the student
+TARGET_LEVEL_MAP = {
+    "A1": "A1-A2",
+    "A2": "A2-B1",
+    "B1": "B1-B2",
+    "B2": "B2-C1",
+    "C1": "C1-C2",
+    "C2": "C2"
+}
+# Expected average score range per stated level - outside it (with margin) the level is adjusted by one
+LEVEL_EXPECTATIONS = {
+    "A1": (0.3, 0.6),
+    "A2": (0.4, 0.7),
+    "B1": (0.5, 0.8),
+    "B2": (0.6, 0.9),
+    "C1": (0.75, 0.95),
+    "C2": (0.85, 1.0)
+}
+
 def get_user_level(profile: dict, quiz_results: list) -> str:
     """
     Get the user's language level, prioritizing stated level from profile.
@@ -190,31 +388,19 @@ def get_user_level(profile: dict, quiz_results: list) -> str:
             avg_score = sum(qr.get("score", 0) for qr in quiz_results) / len(quiz_results)
             
             # Only adjust if quiz performance significantly differs from stated level
-            # Map level to expected score range
-            level_expectations = {
-                "A1": (0.3, 0.6),
-                "A2": (0.4, 0.7),
-                "B1": (0.5, 0.8),
-                "B2": (0.6, 0.9),
-                "C1": (0.75, 0.95),
-                "C2": (0.85, 1.0)
-            }
-            
-            expected_range = level_expectations.get(normalized_stated, (0.3, 0.7))
+            expected_range = LEVEL_EXPECTATIONS.get(normalized_stated, (0.3, 0.7))
             
             # If performance is significantly outside expected range, adjust slightly
             if avg_score < expected_range[0] - 0.2:
                 # Performance much lower - step down one level
-                level_order = ["A1", "A2", "B1", "B2", "C1", "C2"]
-                current_idx = level_order.index(normalized_stated) if normalized_stated in level_order else 0
+                current_idx = CEFR_LEVELS.index(normalized_stated) if normalized_stated in CEFR_LEVELS else 0
                 if current_idx > 0:
-                    return level_order[current_idx - 1]
+                    return CEFR_LEVELS[current_idx - 1]
             elif avg_score > expected_range[1] + 0.15:
                 # Performance much higher - step up one level
-                level_order = ["A1", "A2", "B1", "B2", "C1", "C2"]
-                current_idx = level_order.index(normalized_stated) if normalized_stated in level_order else 0
-                if current_idx < len(level_order) - 1:
-                    return level_order[current_idx + 1]
+                current_idx = CEFR_LEVELS.index(normalized_stated) if normalized_stated in CEFR_LEVELS else 0
+                if current_idx < len(CEFR_LEVELS) - 1:
+                    return CEFR_LEVELS[current_idx + 1]
         
         # Return stated level (possibly adjusted)
         return normalized_stated
@@ -222,18 +408,7 @@ def get_user_level(profile: dict, quiz_results: list) -> str:
     # Fallback: Estimate from quiz results
     if quiz_results:
         avg_score = sum(qr.get("score", 0) for qr in quiz_results) / len(quiz_results)
-        if avg_score >= 0.9:
-            return "C2"
-        elif avg_score >= 0.85:
-            return "C1"
-        elif avg_score >= 0.7:
-            return "B2"
-        elif avg_score >= 0.6:
-            return "B1"
-        elif avg_score >= 0.5:
-            return "A2"
-        else:
-            return "A1"
+        return CEFR_LEVELS[bisect.bisect_right(LEVEL_SCORE_THRESHOLDS, avg_score)]
     
     # Default fallback
     return "A1"
@@ -0,0 +1,30 @@
+"""Vetted vocabulary banks for the low-level image detection quizzes (word -> English translation)."""
+from typing import Dict, Tuple
+
+# Everyday, easy-to-draw objects per (target level, target language); other pairs fall back to the LLM word picker
+IMAGE_DETECTION_WORDS: Dict[Tuple[str, str], Dict[str, str]] = {
+    ("A1-A2", "Spanish"): {
+        "gato": "cat", "perro": "dog", "casa": "house", "mesa": "table", "silla": "chair",
+        "libro": "book", "manzana": "apple", "coche": "car", "árbol": "tree", "sol": "sun",
+        "flor": "flower", "pájaro": "bird", "pez": "fish", "cama": "bed", "puerta": "door",
+        "ventana": "window", "reloj": "clock", "zapato": "shoe", "sombrero": "hat", "llave": "key",
+        "taza": "cup", "plátano": "banana", "pan": "bread", "queso": "cheese", "huevo": "egg",
+        "bicicleta": "bicycle", "lápiz": "pencil", "teléfono": "phone", "caballo": "horse", "vaca": "cow",
+    },
+    ("A1-A2", "French"): {
+        "chat": "cat", "chien": "dog", "maison": "house", "table": "table", "chaise": "chair",
+        "livre": "book", "pomme": "apple", "voiture": "car", "arbre": "tree", "soleil": "sun",
+        "fleur": "flower", "oiseau": "bird", "poisson": "fish", "lit": "bed", "porte": "door",
+        "fenêtre": "window", "horloge": "clock", "chaussure": "shoe", "chapeau": "hat", "clé": "key",
+        "tasse": "cup", "banane": "banana", "pain": "bread", "fromage": "cheese", "œuf": "egg",
+        "vélo": "bicycle", "crayon": "pencil", "téléphone": "phone", "cheval": "horse", "vache": "cow",
+    },
+    ("A1-A2", "Portuguese"): {
+        "gato": "cat", "cachorro": "dog", "casa": "house", "mesa": "table", "cadeira": "chair",
+        "livro": "book", "maçã": "apple", "carro": "car", "árvore": "tree", "sol": "sun",
+        "flor": "flower", "pássaro": "bird", "peixe": "fish", "cama": "bed", "porta": "door",
+        "janela": "window", "relógio": "clock", "sapato": "shoe", "chapéu": "hat", "chave": "key",
+        "xícara": "cup", "banana": "banana", "pão": "bread", "queijo": "cheese", "ovo": "egg",
+        "bicicleta": "bicycle", "lápis": "pencil", "telefone": "phone", "cavalo": "horse", "vaca": "cow",
+    },
+}
@@ -1,12 +1,13 @@
 from fastapi import FastAPI, HTTPException, UploadFile, File, Form
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
 from agent import build_agent
 from config import CONFIG
 import json
 import asyncio
 import os
+import sys
 
 app = FastAPI()
 
@@ -86,6 +87,13 @@ class ReadingValidateRequest(BaseModel):
     articleText: str
     question: str
 
+@app.on_event("shutdown")
+async def shutdown():
+    """Close pooled connections held by the quiz generators."""
+    # Only if a quiz endpoint was ever hit - importing the generators here would build their clients
+    if "quiz_generators.utils" in sys.modules:
+        await sys.modules["quiz_generators.utils"].close_http_client()
+
 @app.get("/health")
 async def health():
     return {"ok": True}
@@ -305,6 +313,46 @@ async def generate_keyword_match_quiz(request: KeywordMatchGenerateRequest):
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/quiz/keyword-match/generate/stream")
+async def stream_keyword_match_quiz(request: KeywordMatchGenerateRequest):
+    """Generate a keyword match quiz, streaming each pair as Server-Sent Events as soon as it is ready."""
+    from quiz_generators import generate_keyword_match
+    from tools import get_session
+    
+    print(f"[Quiz Gen] Session {request.sessionId}, streaming keyword match quiz")
+    
+    async def generate():
+        try:
+            events = await generate_keyword_match(request.sessionId, stream=True)
+            async for event in events:
+                if "quiz" not in event:
+                    yield f"data: {json.dumps(event)}\n\n"
+                    continue
+                
+                quiz_data = event["quiz"]
+                if len(quiz_data["pairs"]) != 5:
+                    yield f"data: {json.dumps({'error': 'Failed to generate quiz - invalid pairs'})}\n\n"
+                    return
+                
+                # Store quiz data in session for validation
+                get_session(request.sessionId)["active_keyword_quiz"] = quiz_data
+                
+                yield f"data: {json.dumps({'done': True, 'quiz': quiz_data})}\n\n"
+        except Exception as e:
+            print(f"[Quiz Gen Error]", e)
+            import traceback
+            traceback.print_exc()
+            yield f"data: {json.dumps({'error': str(e)})}\n\n"
+    
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+        }
+    )
+
 @app.post("/api/quiz/keyword-match/validate")
 async def validate_keyword_match_answer(request: KeywordMatchValidateRequest):
     """Validate user's keyword matches."""
@@ -409,6 +457,17 @@ async def generate_image_detection_quiz(request: ImageDetectionGenerateRequest):
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/quiz/image-detection/image/{image_id}")
+async def get_image_detection_image(image_id: str):
+    """Serve a generated image detection quiz image (used when IMAGE_DETECTION_IMAGE_URLS is enabled)."""
+    from quiz_generators.image_detection import get_image
+    
+    image = get_image(image_id)
+    if image is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    image_bytes, mime_type = image
+    return Response(content=image_bytes, media_type=mime_type, headers={"Cache-Control": "private, max-age=3600"})
+
 @app.post("/api/quiz/image-detection/validate")
 async def validate_image_detection_answer(request: ImageDetectionValidateRequest):
     """Validate user's answer for image detection quiz."""
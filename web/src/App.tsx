@@ -32,6 +32,11 @@ function getImageDataUrl(base64: string): string {
   return `data:image/png;base64,${base64}`
 }
 
+// Helper function to resolve server-relative image URLs (e.g. /api/quiz/image-detection/image/{id}) against the API
+function getImageSrc(url: string): string {
+  return url.startsWith('/') ? `${API_BASE}${url}` : url
+}
+
 
 useEffect(()=>{ accRef.current?.scrollTo({top:999999, behavior:'smooth'}) }, [messages, loading])
 
@@ -1036,7 +1041,7 @@ return (
             {quiz.data.image_url && !quiz.data.image_base64 && (
               <div style={{marginBottom: '16px', textAlign: 'center'}}>
                 <img 
-                  src={quiz.data.image_url}
+                  src={getImageSrc(quiz.data.image_url)}
                   alt="Objeto para identificar"
                   style={{
                     maxWidth: '100%',
@@ -1736,7 +1741,7 @@ boxShadow: '0 4px 12px rgba(0, 0, 0, 0.08)'
 {activeQuiz.data.image_url && !activeQuiz.data.image_base64 && (
 <div style={{marginBottom: '16px', textAlign: 'center'}}>
 <img 
-src={activeQuiz.data.image_url}
+src={getImageSrc(activeQuiz.data.image_url)}
 alt="Objeto para identificar"
 style={{
 maxWidth: '100%',